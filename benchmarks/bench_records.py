@@ -0,0 +1,104 @@
+"""Bytes per record held in memory, parsed dicts vs AllowlistRecords.
+
+Allowlist records are held as raw frames plus dicts (as queries used to),
+as dicts, as AllowlistRecords, or merged in a RecordMerger the way query
+results are; signed 42021 events, what filtered lookups return, as dicts
+or AllowlistRecords. Memory is measured with tracemalloc.
+
+    python benchmarks/bench_records.py --records 1000000
+"""
+import argparse
+import gc
+import os
+import tracemalloc
+
+from nostpy_gui import protocol
+from nostpy_gui.event import RecordMerger
+from nostpy_gui.records import AllowlistRecord
+from relay_stub import allowlist_record
+
+
+def signed_event(index):
+    return {
+        "id": os.urandom(32).hex(),
+        "pubkey": "ab" * 32,
+        "created_at": 1_700_000_000 - index,
+        "kind": 42021,
+        "tags": [["ban", "client_pub", os.urandom(32).hex()]],
+        "content": "",
+        "sig": os.urandom(64).hex(),
+    }
+
+
+def fresh(obj):
+    # A new copy as if just off the wire, sharing nothing with the source
+    return protocol.loads(protocol.dumps(obj))
+
+
+def measure(build, count):
+    gc.collect()
+    tracemalloc.start()
+    held = build()  # noqa: F841 - kept alive until measured
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--records", type=int, default=1000000)
+    parser.add_argument("--events", type=int, default=100000)
+    args = parser.parse_args()
+
+    raw = [allowlist_record(index) for index in range(args.records)]
+
+    results = {
+        # What queries used to hold: every raw frame plus its parsed dict
+        "allowlist frame + dict": measure(
+            lambda: [
+                (frame, protocol.loads(frame)[2])
+                for frame in (
+                    protocol.encode("EVENT", "nostpy_client", record) for record in raw
+                )
+            ],
+            len(raw),
+        ),
+        "allowlist dict": measure(lambda: [fresh(record) for record in raw], len(raw)),
+        "AllowlistRecord": measure(
+            lambda: [AllowlistRecord.from_dict(fresh(record)) for record in raw],
+            len(raw),
+        ),
+    }
+
+    def merged():
+        merger = RecordMerger()
+        merger.add(fresh(record) for record in raw)
+        return merger
+
+    # The merger also holds its per-target index
+    results["RecordMerger"] = measure(merged, len(raw))
+    del raw
+
+    events = [signed_event(index) for index in range(args.events)]
+    event_results = {
+        "signed event dict": measure(
+            lambda: [fresh(event) for event in events], len(events)
+        ),
+        "signed event AllowlistRecord": measure(
+            lambda: [AllowlistRecord.from_dict(fresh(event)) for event in events],
+            len(events),
+        ),
+    }
+
+    for results, baseline in (
+        (results, "allowlist dict"),
+        (event_results, "signed event dict"),
+    ):
+        dict_size = results[baseline]
+        for name, size in results.items():
+            share = size / dict_size
+            print(f"{name:<32} {size:>8,.0f} bytes/record {share:>6.0%} of dict")
+
+
+if __name__ == "__main__":
+    main()
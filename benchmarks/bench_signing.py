@@ -0,0 +1,43 @@
+"""Events/sec for batch event building and signing at several worker counts.
+
+    python benchmarks/bench_signing.py --events 20000
+"""
+import argparse
+import os
+import time
+
+import secp256k1
+
+from nostpy_gui import signing
+
+
+def run(events, workers):
+    private_key = secp256k1.PrivateKey()
+    private_key_hex = private_key.private_key.hex()
+    public_key = private_key.pubkey.serialize()[1:].hex()
+    specs = [("", 42021, [["ban", "client_pub", f"{i:064x}"]]) for i in range(events)]
+
+    start = time.perf_counter()
+    built = signing.build_events(
+        private_key_hex, public_key, specs, int(time.time()), workers=workers
+    )
+    elapsed = time.perf_counter() - start
+    assert len(built) == events
+    return events / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--workers", type=int, nargs="*")
+    args = parser.parse_args()
+
+    cpus = os.cpu_count() or 1
+    worker_counts = args.workers or sorted({1, 2, 4, cpus})
+    for workers in worker_counts:
+        rate = run(args.events, workers)
+        print(f"workers={workers:<3} {rate:>12,.0f} events/sec")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Startup time: import of nostpy_gui.main and time to first window paint.
+
+Each run is a fresh interpreter, so nothing is warm from a previous run.
+
+    python benchmarks/bench_startup.py --runs 5 --max-first-paint 1.5
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+HEAVY_MODULES = ("secp256k1", "websockets", "sqlite3")
+
+
+def child():
+    start = time.perf_counter()
+    from nostpy_gui.main import DarkModeApp
+
+    imported = time.perf_counter()
+    app = DarkModeApp()
+    app.update_idletasks()
+    app.wait_visibility()
+    app.update()
+    painted = time.perf_counter()
+    print(
+        json.dumps(
+            {
+                "import_s": imported - start,
+                "first_paint_s": painted - start,
+                "heavy_modules_loaded": [m for m in HEAVY_MODULES if m in sys.modules],
+            }
+        )
+    )
+    app.on_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument(
+        "--max-first-paint",
+        type=float,
+        help="exit non-zero if the median time to first paint exceeds this (s)",
+    )
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        return child()
+
+    runs = []
+    for _ in range(args.runs):
+        output = subprocess.run(
+            [sys.executable, __file__, "--child"],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+
+    import_s = statistics.median(run["import_s"] for run in runs)
+    first_paint_s = statistics.median(run["first_paint_s"] for run in runs)
+    heavy = sorted({m for run in runs for m in run["heavy_modules_loaded"]})
+    print(f"import nostpy_gui.main  median {import_s * 1000:8.1f} ms")
+    print(f"first window paint      median {first_paint_s * 1000:8.1f} ms")
+    print(f"heavy modules at paint  {', '.join(heavy) or 'none'}")
+
+    if args.max_first_paint and first_paint_s > args.max_first_paint:
+        print(f"first paint regressed past {args.max_first_paint}s")
+        sys.exit(1)
+    if heavy:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
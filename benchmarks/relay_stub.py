@@ -0,0 +1,87 @@
+"""In-process stand-in nostr relay for benchmarks.
+
+Speaks just enough NIP-01 for the client: EVENT is answered with OK, REQ
+streams a synthetic 42021 allowlist of `records` entries (newest first,
+honouring since/until/limit) followed by EOSE, COUNT (NIP-45) is answered
+with the size of that same range unless `count=False`, CLOSE is accepted
+silently. Every reply is delayed by `latency` seconds.
+"""
+import asyncio
+import json
+
+import websockets
+
+BASE_CREATED_AT = 1_700_000_000
+
+
+def allowlist_record(index):
+    return {
+        "client_pub": f"{index:064x}",
+        "kind": None,
+        "allowed": index % 7 != 0,
+        "note_id": f"{index:064x}"[::-1],
+        "created_at": BASE_CREATED_AT - index,
+    }
+
+
+class RelayStub:
+    def __init__(self, latency=0.0, records=1000, host="127.0.0.1", count=True):
+        self.latency = latency
+        self.records = records
+        self.count = count
+        self.host = host
+        self.frames_sent = 0
+        self._server = None
+
+    @property
+    def url(self):
+        port = next(iter(self._server.sockets)).getsockname()[1]
+        return f"ws://{self.host}:{port}"
+
+    async def __aenter__(self):
+        self._server = await websockets.serve(
+            self._handle, self.host, 0, max_size=None, ping_interval=None
+        )
+        return self
+
+    async def __aexit__(self, *exc):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _handle(self, ws, path=None):
+        try:
+            async for raw in ws:
+                message = json.loads(raw)
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+                if message[0] == "EVENT":
+                    await ws.send(json.dumps(["OK", message[1]["id"], True, ""]))
+                elif message[0] == "REQ":
+                    await self._stream(ws, message[1], message[2])
+                elif message[0] == "COUNT" and self.count:
+                    first, last = self._range(message[2])
+                    await ws.send(
+                        json.dumps(["COUNT", message[1], {"count": last - first}])
+                    )
+        except websockets.ConnectionClosed:
+            pass
+
+    def _range(self, query):
+        # created_at is BASE - index, so since/until map straight to indices
+        first = 0
+        if "until" in query:
+            first = max(0, BASE_CREATED_AT - query["until"])
+        last = self.records
+        if "since" in query:
+            last = min(last, BASE_CREATED_AT - query["since"] + 1)
+        if "limit" in query:
+            last = min(last, first + query["limit"])
+        return first, max(first, last)
+
+    async def _stream(self, ws, sub_id, query):
+        first, last = self._range(query)
+        prefix = f'["EVENT",{json.dumps(sub_id)},'
+        for index in range(first, last):
+            await ws.send(prefix + json.dumps(allowlist_record(index)) + "]")
+            self.frames_sent += 1
+        await ws.send(json.dumps(["EOSE", sub_id]))
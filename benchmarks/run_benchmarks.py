@@ -0,0 +1,123 @@
+"""Client throughput and latency against the local relay stub.
+
+Measures Event.create_event events/sec, send_event round trip latency,
+query_relays time-to-EOSE and protocol.decode cost per frame for allowlists
+of each size, and writes everything to a JSON file so runs can be compared.
+
+    python benchmarks/run_benchmarks.py --sizes 1000 100000 1000000 \
+        --latency 0.005 --output bench_results.json
+"""
+import argparse
+import asyncio
+import json
+import platform
+import statistics
+import time
+
+import secp256k1
+
+from nostpy_gui import protocol
+from nostpy_gui.event import Event
+from nostpy_gui.pool import get_pool
+from nostpy_gui.subscriptions import close_sessions
+from relay_stub import RelayStub, allowlist_record
+
+
+def make_event(relay_url):
+    private_key = secp256k1.PrivateKey()
+    return Event(
+        [relay_url],
+        public_key=private_key.pubkey.serialize()[1:].hex(),
+        private_key_hex=private_key.private_key.hex(),
+    )
+
+
+def bench_create_event(event, count):
+    start = time.perf_counter()
+    for index in range(count):
+        event.create_event("", 42021, [["ban", "client_pub", f"{index:064x}"]])
+    return {"events": count, "events_per_s": count / (time.perf_counter() - start)}
+
+
+async def bench_send_event(event, count):
+    latencies = []
+    for index in range(count):
+        start = time.perf_counter()
+        await event.send_event("", 42021, [["allow", "client_pub", f"{index:064x}"]])
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return {
+        "sends": count,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        "mean_ms": statistics.mean(latencies) * 1000,
+        "pool": get_pool().stats(),
+    }
+
+
+async def bench_query(event, size):
+    start = time.perf_counter()
+    records = await event.query_relays(
+        {"kinds": [42021], "limit": size}, timeout=max(60, size / 1000)
+    )
+    elapsed = time.perf_counter() - start
+    return {
+        "records": len(records),
+        "time_to_eose_s": elapsed,
+        "records_per_s": len(records) / elapsed if elapsed else None,
+    }
+
+
+def bench_parse(size, distinct=1000):
+    frames = [
+        json.dumps(["EVENT", "nostpy_client", allowlist_record(index)])
+        for index in range(min(size, distinct))
+    ]
+    start = time.perf_counter()
+    for index in range(size):
+        protocol.decode(frames[index % len(frames)])
+    elapsed = time.perf_counter() - start
+    return {"frames": size, "ns_per_frame": elapsed / size * 1e9}
+
+
+async def run(args):
+    results = {
+        "timestamp": int(time.time()),
+        "python": platform.python_version(),
+        "json_backend": "orjson" if protocol.orjson else "json",
+        "latency_s": args.latency,
+        "queries": {},
+        "parse": {},
+    }
+    largest = max(args.sizes)
+    async with RelayStub(latency=args.latency, records=largest) as stub:
+        event = make_event(stub.url)
+        results["create_event"] = bench_create_event(event, args.events)
+        results["send_event"] = await bench_send_event(event, args.sends)
+        for size in args.sizes:
+            results["queries"][str(size)] = await bench_query(event, size)
+            results["parse"][str(size)] = bench_parse(size)
+        await close_sessions()
+        await get_pool().close_all()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[1000, 100000, 1000000]
+    )
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--events", type=int, default=2000)
+    parser.add_argument("--sends", type=int, default=200)
+    parser.add_argument("--output", default="bench_results.json")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    with open(args.output, "w", encoding="utf-8") as handle:
+        json.dump(results, handle, indent=2)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+import asyncio
+import mmap
+from collections import OrderedDict
+from logging import ERROR, INFO
+from nostpy_gui import protocol
+from nostpy_gui.event import BULK_WINDOW, record_id
+from nostpy_gui.reconcile import record_state, spec_for
+
+IMPORT_BATCH = 1000
+EXPORT_SEEN = 100000  # recent ids an export remembers for de-duplication
+WRITE_BUFFER = 1 << 20
+
+
+class ArchiveError(ValueError):
+    pass
+
+
+class NdjsonWriter:
+    # One record or event per line, written as batches arrive so an export
+    # never holds more than the batch in hand
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self._file = open(path, "w", encoding="utf-8", buffering=WRITE_BUFFER)
+
+    def write(self, records):
+        lines = [
+            protocol.dumps(record.to_dict() if hasattr(record, "to_dict") else record)
+            for record in records
+        ]
+        if lines:
+            self._file.write("\n".join(lines) + "\n")
+            self.count += len(lines)
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def iter_batches(path, batch_size=IMPORT_BATCH):
+    # The file is memory-mapped and parsed a batch at a time, the OS pages
+    # it in and out as needed, so archive size doesn't matter
+    with open(path, "rb") as handle:
+        try:
+            mapped = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            return  # empty file, nothing to map
+        with mapped:
+            batch = []
+            position = 0
+            line_number = 0
+            size = len(mapped)
+            while position < size:
+                end = mapped.find(b"\n", position)
+                if end == -1:
+                    end = size
+                line = mapped[position:end].strip()
+                position = end + 1
+                line_number += 1
+                if not line:
+                    continue
+                try:
+                    item = protocol.loads(line)
+                except ValueError as exc:
+                    raise ArchiveError(f"{path}:{line_number}: {exc}") from exc
+                if not isinstance(item, dict):
+                    raise ArchiveError(f"{path}:{line_number}: not a JSON object")
+                batch.append(item)
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+            if batch:
+                yield batch
+
+
+def is_signed_event(item) -> bool:
+    return all(key in item for key in ("id", "pubkey", "sig"))
+
+
+async def export_query(event, query_dict, path, timeout=5):
+    # Full query (no since-last-sync) streamed to path, every raw record
+    # written the moment its page arrives and nothing merged, so older
+    # versions of a record are exported too. Only the ids of the last
+    # EXPORT_SEEN records are kept, to drop the copies other relays and
+    # overlapping pages send. Returns lines written
+    seen = OrderedDict()
+
+    with NdjsonWriter(path) as writer:
+
+        def emit(relay, records):
+            fresh = []
+            for record in records:
+                key = record_id(record)
+                if key in seen:
+                    seen.move_to_end(key)
+                    continue
+                seen[key] = None
+                if len(seen) > EXPORT_SEEN:
+                    seen.popitem(last=False)
+                fresh.append(record)
+            writer.write(fresh)
+
+        await event.stream_query(query_dict, emit, timeout=timeout)
+    event.log(f"Exported {writer.count} records to {path}", INFO)
+    return writer.count
+
+
+def record_time(record):
+    return record.get("created_at") or 0
+
+
+def newest_records(path, batch_size=IMPORT_BATCH) -> dict:
+    # First pass over an archive: the created_at of the newest record per
+    # target. Exports hold every version of a record, in arrival order
+    newest = {}
+    for batch in iter_batches(path, batch_size):
+        for item in batch:
+            if is_signed_event(item):
+                continue
+            state = record_state(item)
+            if state is not None:
+                created_at = record_time(item)
+                if created_at >= newest.get(state[0], created_at):
+                    newest[state[0]] = created_at
+    return newest
+
+
+async def replay(event, path, batch_size=IMPORT_BATCH, window=BULK_WINDOW):
+    # Signed events are sent as they are; allowlist records are turned back
+    # into ban/allow events signed with our key, by one signing pool kept
+    # for the whole archive. Returns per relay totals
+    newest = newest_records(path, batch_size)
+    report = {
+        relay: {"accepted": 0, "rejected": 0, "failed": 0} for relay in event.relays
+    }
+
+    def tally(result):
+        for relay, counts in result.items():
+            for key, value in counts.items():
+                report[relay][key] += value
+
+    pool = None
+    try:
+        for batch in iter_batches(path, batch_size):
+            signed = []
+            specs = []
+            for item in batch:
+                if is_signed_event(item):
+                    signed.append(item)
+                    continue
+                state = record_state(item)
+                # Re-signed events all get the same created_at, the relay
+                # would keep whichever came last; only the newest version
+                # of each target is sent, once
+                if state is not None and newest.get(state[0]) == record_time(item):
+                    del newest[state[0]]
+                    specs.append(spec_for(*state))
+            if signed:
+                results = await asyncio.gather(
+                    *(
+                        event.deliver(relay, signed, window=window)
+                        for relay in event.relays
+                    ),
+                    return_exceptions=True,
+                )
+                for relay, result in zip(event.relays, results):
+                    if isinstance(result, Exception):
+                        event.log(f"Import to {relay} failed: {result}", ERROR)
+                        result = {"accepted": 0, "rejected": 0, "failed": len(signed)}
+                    tally({relay: result})
+            if specs:
+                if pool is None:
+                    pool = event.signing_pool()
+                tally(await event.send_bulk(specs, window=window, pool=pool))
+    finally:
+        if pool is not None:
+            await asyncio.get_event_loop().run_in_executor(None, pool.shutdown)
+    return report
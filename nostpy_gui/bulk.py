@@ -0,0 +1,121 @@
+import tkinter as tk
+from tkinter import ttk, filedialog
+from nostpy_gui.event import BULK_WINDOW, Event, split_relays
+
+
+def parse_entries(text: str) -> list:
+    # One pubkey or kind per line (commas and spaces also separate),
+    # "#" starts a comment, duplicates are dropped keeping file order
+    entries = []
+    seen = set()
+    for line in text.splitlines():
+        line = line.split("#", 1)[0]
+        for entry in line.replace(",", " ").split():
+            if entry not in seen:
+                seen.add(entry)
+                entries.append(entry)
+    return entries
+
+
+class BulkImportDialog(tk.Toplevel):
+    def __init__(self, parent, controller, output_widget):
+        super().__init__(parent)
+        self.controller = controller
+        self.output_widget = output_widget
+        self.title("Bulk Moderation Import")
+        self.geometry("600x500")
+        self.configure(bg="#2E2E2E")
+
+        self.verb = tk.StringVar(value="ban")
+        self.obj_type = tk.StringVar(value="client_pub")
+        self.window = tk.IntVar(value=BULK_WINDOW)
+        self.status = tk.StringVar(value="Paste a list or load a file")
+
+        options = ttk.Frame(self)
+        options.pack(fill="x", padx=10, pady=10)
+        ttk.Label(options, text="Action").pack(side="left")
+        ttk.Combobox(
+            options,
+            textvariable=self.verb,
+            values=("ban", "allow"),
+            state="readonly",
+            width=8,
+        ).pack(side="left", padx=5)
+        ttk.Label(options, text="Type").pack(side="left")
+        ttk.Combobox(
+            options,
+            textvariable=self.obj_type,
+            values=("client_pub", "kind"),
+            state="readonly",
+            width=10,
+        ).pack(side="left", padx=5)
+        ttk.Label(options, text="In flight").pack(side="left")
+        ttk.Spinbox(
+            options, from_=1, to=5000, textvariable=self.window, width=6
+        ).pack(side="left", padx=5)
+        ttk.Button(options, text="Load File", command=self.load_file).pack(
+            side="right"
+        )
+
+        self.entries_text = tk.Text(self, height=15, bg="#2E2E2E", fg="#FFFFFF")
+        self.entries_text.pack(fill="both", expand=True, padx=10)
+
+        self.progress = ttk.Progressbar(self, mode="determinate")
+        self.progress.pack(fill="x", padx=10, pady=10)
+        ttk.Label(self, textvariable=self.status).pack(pady=5)
+        self.start_button = ttk.Button(self, text="Start", command=self.start)
+        self.start_button.pack(pady=10)
+
+    def load_file(self):
+        path = filedialog.askopenfilename(parent=self, title="Pubkey or kind list")
+        if path:
+            with open(path, encoding="utf-8") as handle:
+                self.entries_text.delete("1.0", tk.END)
+                self.entries_text.insert("1.0", handle.read())
+
+    def start(self):
+        entries = parse_entries(self.entries_text.get("1.0", tk.END))
+        if not entries:
+            self.status.set("Nothing to send")
+            return
+        relays = split_relays(self.controller.relay_url.get())
+        verb = self.verb.get()
+        obj_type = self.obj_type.get()
+        specs = [("", 42021, [[verb, obj_type, entry]]) for entry in entries]
+
+        self.progress.configure(maximum=len(specs) * len(relays), value=0)
+        self._done = {relay: 0 for relay in relays}
+        self.start_button.configure(state="disabled")
+        self.status.set(f"Sending {len(specs)} events to {len(relays)} relay(s)...")
+
+        event = Event.from_controller(
+            relays, self.controller, self.output_widget
+        )
+        self.controller.run_async(
+            event.send_bulk(
+                specs, window=max(1, self.window.get()), on_progress=self.on_progress
+            ),
+            on_done=self.on_finished,
+        )
+
+    def on_progress(self, relay, done, total):
+        if not self.winfo_exists():
+            return
+        self._done[relay] = done
+        self.progress.configure(value=sum(self._done.values()))
+
+    def on_finished(self, future):
+        if not self.winfo_exists():
+            return
+        self.start_button.configure(state="normal")
+        if future.exception():
+            self.status.set(f"Bulk send failed: {future.exception()}")
+            return
+        report = future.result()
+        self.status.set(
+            "; ".join(
+                f"{relay}: {result['accepted']} ok, {result['rejected']} rejected, "
+                f"{result['failed']} failed"
+                for relay, result in report.items()
+            )
+        )
@@ -0,0 +1,255 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+from logging import DEBUG, ERROR, INFO
+from nostpy_gui.records import MODERATION_KIND
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="nostpy-gui", description="Nostpy relay admin client"
+    )
+    parser.add_argument(
+        "--headless",
+        action="store_true",
+        help="run a single command without the GUI and print JSON lines",
+    )
+    parser.add_argument(
+        "--relay",
+        action="append",
+        default=[],
+        help="relay URL, repeatable (default: $NOSTPY_RELAYS, comma separated)",
+    )
+    parser.add_argument(
+        "--key-file",
+        help='JSON file with "private_key" and optionally "public_key" hex '
+        "(default: $NOSTPY_PRIVATE_KEY / $NOSTPY_PUBLIC_KEY)",
+    )
+    parser.add_argument(
+        "--verbose", action="store_true", help="also print raw relay frames"
+    )
+    commands = parser.add_subparsers(dest="command")
+
+    for verb in ("ban", "allow"):
+        command = commands.add_parser(verb, help=f"{verb} a pubkey or kind")
+        target = command.add_mutually_exclusive_group(required=True)
+        target.add_argument("--pubkey", help="pubkey hex")
+        target.add_argument("--kind", help="event kind")
+
+    delete = commands.add_parser("delete", help="delete all events from a pubkey")
+    delete.add_argument("pubkey", help="pubkey hex")
+
+    count = commands.add_parser(
+        "count", help="count a pubkey's events by kind, e.g. before a delete"
+    )
+    count.add_argument("pubkey", help="pubkey hex")
+
+    reconcile = commands.add_parser(
+        "reconcile", help="send only the events needed to match a policy file"
+    )
+    reconcile.add_argument(
+        "policy",
+        help='JSON file: {"allow": {"client_pub": [...], "kind": [...]}, "ban": ...}',
+    )
+    reconcile.add_argument(
+        "--dry-run", action="store_true", help="print the plan without sending"
+    )
+
+    query = commands.add_parser("query", help="print the relay allowlist")
+    query.add_argument("--author", action="append", default=[], metavar="PUBKEY")
+    query.add_argument(
+        "--p", action="append", default=[], metavar="PUBKEY", help="#p tag filter"
+    )
+    query.add_argument("--since", type=int)
+    query.add_argument("--until", type=int)
+    query.add_argument("--limit", type=int)
+    query.add_argument(
+        "--export", metavar="FILE", help="stream the records to an NDJSON file"
+    )
+
+    replay = commands.add_parser(
+        "import", help="replay an NDJSON archive of records or signed events"
+    )
+    replay.add_argument("archive", help="NDJSON file, e.g. from query --export")
+    return parser
+
+
+def load_keys(key_file=None):
+    private_key = os.environ.get("NOSTPY_PRIVATE_KEY", "")
+    public_key = os.environ.get("NOSTPY_PUBLIC_KEY", "")
+    if key_file:
+        with open(key_file, encoding="utf-8") as handle:
+            keys = json.load(handle)
+        private_key = keys.get("private_key", private_key)
+        public_key = keys.get("public_key", public_key)
+    if private_key and not public_key:
+        from nostpy_gui import signing
+
+        public_key = signing.public_key_from_private(private_key)
+    return public_key, private_key
+
+
+async def run_command(args, event, sink):
+    from nostpy_gui import protocol
+    from nostpy_gui.pool import get_pool
+    from nostpy_gui.subscriptions import close_sessions
+
+    try:
+        if args.command == "query":
+            from nostpy_gui.filters import FilterError, build_filter
+
+            try:
+                query_dict = build_filter(
+                    authors=args.author,
+                    tags={"p": args.p} if args.p else None,
+                    since=args.since,
+                    until=args.until,
+                    limit=args.limit,
+                )
+            except FilterError as exc:
+                sink.log(str(exc), ERROR)
+                return 2
+            if args.export:
+                from nostpy_gui.archive import export_query
+
+                count = await export_query(event, query_dict, args.export)
+                sink.emit({"type": "export", "path": args.export, "records": count})
+                return 0
+            for record in await event.query_relays(query_dict):
+                sink.emit({"type": "record", "record": record.to_dict()})
+            return 0
+
+        if args.command == "import":
+            from nostpy_gui.archive import ArchiveError, replay
+
+            try:
+                report = await replay(event, args.archive)
+            except (OSError, ArchiveError) as exc:
+                sink.log(str(exc), ERROR)
+                return 2
+            exit_code = 0
+            for relay, result in report.items():
+                sink.emit(dict(result, type="result", relay=relay))
+                if result["rejected"] or result["failed"]:
+                    exit_code = 1
+            return exit_code
+
+        if args.command == "count":
+            report = await event.count_events(args.pubkey)
+            exit_code = 0
+            for relay, result in report.items():
+                if isinstance(result, BaseException):
+                    sink.log(f"{relay}: {result or type(result).__name__}", ERROR)
+                    exit_code = 1
+                    continue
+                result["by_kind"] = {
+                    str(kind): count for kind, count in result["by_kind"].items()
+                }
+                sink.emit(dict(result, type="count", relay=relay))
+            return exit_code
+
+        if args.command == "reconcile":
+            return await run_reconcile(args, event, sink)
+
+        if args.command == "delete":
+            tags = [["delete_pub", args.pubkey]]
+        elif args.kind is not None:
+            tags = [[args.command, "kind", args.kind]]
+        else:
+            tags = [[args.command, "client_pub", args.pubkey]]
+        results = await event.send_event("", MODERATION_KIND, tags)
+    finally:
+        await close_sessions()
+        await get_pool().close_all()
+
+    if not results:
+        return 1
+    exit_code = 0
+    for relay, result in results.items():
+        if isinstance(result, BaseException):
+            accepted, message = False, str(result) or type(result).__name__
+        else:
+            ok = protocol.decode(result)
+            accepted, message = ok.accepted, ok.message
+        sink.emit(
+            {"type": "result", "relay": relay, "accepted": accepted, "message": message}
+        )
+        if not accepted:
+            exit_code = 1
+    return exit_code
+
+
+async def run_reconcile(args, event, sink):
+    from nostpy_gui.reconcile import PolicyError, load_policy, plan_reconcile
+
+    try:
+        desired = load_policy(args.policy)
+    except (OSError, PolicyError) as exc:
+        sink.log(str(exc), ERROR)
+        return 2
+    plans = await plan_reconcile(event, desired)
+    exit_code = 0
+    for relay, specs in list(plans.items()):
+        if isinstance(specs, BaseException):
+            sink.emit({"type": "plan", "relay": relay, "error": str(specs)})
+            del plans[relay]
+            exit_code = 1
+            continue
+        sink.emit(
+            {
+                "type": "plan",
+                "relay": relay,
+                "changes": [tags[0] for _, _, tags in specs],
+            }
+        )
+    plans = {relay: specs for relay, specs in plans.items() if specs}
+    if args.dry_run or not plans:
+        return exit_code
+    report = await event.send_planned(plans)
+    for relay, result in report.items():
+        sink.emit(dict(result, type="result", relay=relay))
+        if result["rejected"] or result["failed"]:
+            exit_code = 1
+    return exit_code
+
+
+def run_headless(args):
+    # Only the network and crypto stack is imported here, never tkinter
+    from nostpy_gui.event import Event, split_relays
+    from nostpy_gui.sinks import JsonLinesSink
+
+    sink = JsonLinesSink(min_level=DEBUG if args.verbose else INFO)
+    relays = args.relay or split_relays(os.environ.get("NOSTPY_RELAYS", ""))
+    if not relays:
+        sink.log("No relays given, use --relay or $NOSTPY_RELAYS", ERROR)
+        return 2
+    public_key, private_key = load_keys(args.key_file)
+    needs_key = args.command not in ("query", "count")
+    if args.command == "reconcile" and args.dry_run:
+        needs_key = False
+    if needs_key and not private_key:
+        sink.log("No private key, use --key-file or $NOSTPY_PRIVATE_KEY", ERROR)
+        return 2
+
+    event = Event(
+        relays, public_key=public_key, private_key_hex=private_key, sink=sink
+    )
+    return asyncio.run(run_command(args, event, sink))
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if not args.headless:
+        from nostpy_gui.main import main as gui_main
+
+        return gui_main()
+    if not args.command:
+        parser.error("--headless needs a command: ban, allow, delete or query")
+    sys.exit(run_headless(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+import threading
+import tkinter as tk
+from collections import deque
+from logging import DEBUG, ERROR, INFO, WARNING
+from tkinter import ttk
+
+MAX_LINES = 5000
+FLUSH_MS = 33
+
+LEVEL_COLORS = {
+    DEBUG: "#9E9E9E",
+    INFO: "#20C20E",
+    WARNING: "#FF5733",
+    ERROR: "#FF3333",
+}
+LEVEL_FILTERS = {
+    "All (raw frames)": DEBUG,
+    "Info": INFO,
+    "Warnings": WARNING,
+    "Errors": ERROR,
+}
+
+
+class LogConsole(ttk.Frame):
+    # log() may be called from any thread; messages are buffered and written
+    # to the Text widget in one insert per flush, and only the last
+    # max_lines messages are kept
+    def __init__(self, parent, height=20, max_lines=MAX_LINES):
+        super().__init__(parent)
+        self.max_lines = max_lines
+        self._lines = deque(maxlen=max_lines)
+        self._pending = deque(maxlen=max_lines)
+        self._lock = threading.Lock()
+        self.level_filter = tk.StringVar(value="Info")
+
+        toolbar = ttk.Frame(self)
+        toolbar.pack(fill="x")
+        ttk.Label(toolbar, text="Show").pack(side="left")
+        level_box = ttk.Combobox(
+            toolbar,
+            textvariable=self.level_filter,
+            values=tuple(LEVEL_FILTERS),
+            state="readonly",
+            width=16,
+        )
+        level_box.pack(side="left", padx=5)
+        level_box.bind("<<ComboboxSelected>>", lambda event: self._rerender())
+
+        self.text = tk.Text(self, height=height, bg="#2E2E2E", fg="#FFFFFF")
+        self.text.pack(fill="both", expand=True)
+        for level, color in LEVEL_COLORS.items():
+            self.text.tag_configure(str(level), foreground=color)
+
+        self.after(FLUSH_MS, self._flush)
+
+    def log(self, text, level=INFO):
+        with self._lock:
+            self._pending.append((level, text))
+
+    def clear(self):
+        with self._lock:
+            self._pending.clear()
+        self._lines.clear()
+        self.text.delete("1.0", tk.END)
+
+    def set_foreground(self, color):
+        self.text.config(fg=color)
+
+    def _min_level(self):
+        return LEVEL_FILTERS.get(self.level_filter.get(), DEBUG)
+
+    def _flush(self):
+        try:
+            with self._lock:
+                pending, self._pending = self._pending, deque(maxlen=self.max_lines)
+            if pending:
+                self._lines.extend(pending)
+                self._write(pending)
+        finally:
+            self.after(FLUSH_MS, self._flush)
+
+    def _write(self, entries):
+        min_level = self._min_level()
+        chunks = []
+        for level, text in entries:
+            if level >= min_level:
+                chunks.extend((f"{text}\n", str(level)))
+        if not chunks:
+            return
+        self.text.insert(tk.END, *chunks)
+        excess = int(self.text.index("end-1c").split(".")[0]) - self.max_lines
+        if excess > 0:
+            self.text.delete("1.0", f"{excess + 1}.0")
+        self.text.see(tk.END)
+
+    def _rerender(self):
+        self.text.delete("1.0", tk.END)
+        self._write(self._lines)
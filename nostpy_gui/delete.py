@@ -1,8 +1,9 @@
 
 import tkinter as tk
-from tkinter import ttk
-import asyncio
-from nostpy_gui.event import Event
+from tkinter import messagebox, ttk
+from logging import ERROR, INFO, WARNING
+from nostpy_gui.console import LogConsole
+from nostpy_gui.event import Event, split_relays
 
 
 class DeleteEventPage(ttk.Frame):
@@ -40,33 +41,82 @@ class DeleteEventPage(ttk.Frame):
         button = ttk.Button(
             sidebar,
             text="Delete all events from pubkey",
-            command=lambda: self.send_note(
-                "delete_pub", self.public_key_to_mod.get()
-            ),
+            command=lambda: self.preview_delete(self.public_key_to_mod.get()),
         )
         button.pack(pady=5)
 
         main_content = ttk.Frame(self)
         main_content.pack(fill="both", expand=True, padx=10, pady=10)
 
-        self.output_text = tk.Text(main_content, height=20, bg="#2E2E2E", fg="#FFFFFF")
+        self.output_text = LogConsole(main_content, height=20)
         self.output_text.pack(pady=10, padx=30, fill="both", expand=True)
 
+    def preview_delete(self, pubkey):
+        pubkey = pubkey.strip()
+        if not pubkey:
+            self.output_text.log("Enter a pubkey to delete", WARNING)
+            return
+        relay_urls = split_relays(self.relay_url.get())
+        event = Event.from_controller(
+            relay_urls, self.controller, self.output_text
+        )
+        self.output_text.log(f"Counting events from {pubkey}...", INFO)
+        self.controller.run_async(
+            event.count_events(pubkey),
+            on_done=lambda future: self.confirm_delete(pubkey, future),
+        )
+
+    def confirm_delete(self, pubkey, future):
+        try:
+            report = future.result()
+        except Exception as exc:
+            self.output_text.log(f"Counting failed: {exc}", ERROR)
+            return
+        summary = describe_counts(report)
+        self.output_text.log(summary, INFO)
+        if messagebox.askyesno(
+            "Confirm delete",
+            f"Delete all events from {pubkey}?\n\n{summary}",
+            parent=self,
+        ):
+            self.send_note("delete_pub", pubkey)
+
     def send_note(self, verb, obj_to_mod):
-        relay_urls = [self.relay_url.get()]
+        relay_urls = split_relays(self.relay_url.get())
         content = self.content.get()
         kind = int(42021)
         tags = [[verb, obj_to_mod]]
 
-        event = Event(
-            relays=relay_urls,
-            controller=self.controller,
-            output_widget=self.output_text,
+        event = Event.from_controller(
+            relay_urls, self.controller, self.output_text
+        )
+        self.controller.run_async(
+            event.queue_event(content, kind, tags, self.controller.outbox)
         )
-        asyncio.run(event.send_event(content, kind, tags))
 
     def clear_output(self):
-        self.output_text.delete("1.0", tk.END)
+        self.output_text.clear()
 
     def change_text_color(self, color):
-        self.output_text.config(fg=color)
\ No newline at end of file
+        self.output_text.set_foreground(color)
+
+
+def describe_counts(report) -> str:
+    lines = []
+    for relay, result in report.items():
+        if isinstance(result, BaseException):
+            lines.append(f"{relay}: count failed ({result or type(result).__name__})")
+            continue
+        total = result["total"]
+        if result["approximate"]:
+            total = f"{total}+" if result["method"] == "scan" else f"~{total}"
+        lines.append(f"{relay}: {total} events")
+        for kind, count in sorted(
+            result["by_kind"].items(), key=lambda item: -item[1]
+        ):
+            if kind == "unknown":
+                unanswered = ", ".join(str(kind) for kind in result["unknown_kinds"])
+                lines.append(f"    unknown (no count for kinds {unanswered}): {count}")
+            else:
+                lines.append(f"    kind {kind}: {count}")
+    return "\n".join(lines)
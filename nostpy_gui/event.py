@@ -1,34 +1,87 @@
-import tkinter as tk
 import asyncio
 import json
-import secp256k1
-import hashlib
 import time
-import websockets
-import ast
+from collections import Counter
+from logging import DEBUG, ERROR, INFO, WARNING
+from nostpy_gui import protocol, signing
+from nostpy_gui.filters import query_cache
+from nostpy_gui.metrics import recorder
+from nostpy_gui.pool import get_pool
+from nostpy_gui.records import AllowlistRecord
+from nostpy_gui.subscriptions import CONNECTION_LOST, get_session
+
+BULK_WINDOW = 100
+VERIFY_SAMPLE = 0.01
+PAGE_SIZE = 500
+STREAM_BATCH = 200
+# Kinds counted one by one in a delete preview, the rest is lumped as "other"
+PREVIEW_KINDS = (0, 1, 3, 4, 5, 6, 7, 1984, 9735, 10002, 30023)
+SCAN_CAP = 5000
+
+
+class IncompleteQuery(Exception):
+    # A relay stopped answering, or closed the query, before every page
+    # ended in EOSE
+    pass
+
 
 class Event:
-    def __init__(self, relays, controller, output_widget=None, treeview=None) -> None:
+    # UI agnostic: output goes to a sink with a log(text, level) method
+    # (the GUI's LogConsole, or one from nostpy_gui.sinks) and callbacks
+    # such as on_batch are handed to dispatch, e.g. to get onto the Tk thread
+    def __init__(
+        self,
+        relays,
+        public_key="",
+        private_key_hex="",
+        sink=None,
+        dispatch=None,
+        metrics=None,
+    ) -> None:
         self.relays = relays
-        self.controller = controller  # Store the controller reference to access keys
-        self.output_widget = output_widget
-        self.treeview = treeview
-        if self.output_widget:
-            self.output_widget.tag_configure("color32", foreground="#20C20E")
-            self.output_widget.tag_configure("color33", foreground="#FF5733")
-            self.output_widget.tag_configure("color31", foreground="#FF3333")
-
-    def print_color(self, text, color):
-        if self.output_widget:
-            self.output_widget.insert(tk.END, f"{text}\n", (color,))
-            self.output_widget.see(tk.END)  # Auto-scroll to the end
+        self.public_key = public_key
+        self.private_key_hex = private_key_hex
+        self.sink = sink
+        self.dispatch = dispatch
+        self.metrics = metrics or recorder
+
+    @classmethod
+    def from_controller(cls, relays, controller, output_widget=None):
+        # Keys are read here, on the Tk thread, since the coroutines below
+        # run on the app's worker loop
+        return cls(
+            relays,
+            public_key=controller.public_key.get(),
+            private_key_hex=controller.private_key.get(),
+            sink=output_widget,
+            dispatch=controller.post_to_ui,
+        )
+
+    def _on_ui(self, func, *args):
+        if self.dispatch:
+            self.dispatch(func, *args)
+        else:
+            func(*args)
+
+    def log(self, text, level=INFO):
+        # Sinks buffer and are safe to call from the worker loop
+        if self.sink:
+            self.sink.log(text, level)
+
+    async def _send(self, ws, relay, frame):
+        await ws.send(frame)
+        # Frames are JSON with hex ids, so characters are bytes near enough
+        self.metrics.count(relay, bytes_out=len(frame))
+
+    async def _recv(self, ws, relay):
+        frame = await ws.recv()
+        self.metrics.count(relay, bytes_in=len(frame))
+        return frame
 
     def sign_event_id(self, event_id: str, private_key_hex: str) -> str:
-        private_key = secp256k1.PrivateKey(bytes.fromhex(private_key_hex))
-        sig = private_key.schnorr_sign(
-            bytes.fromhex(event_id), bip340tag=None, raw=True
+        return signing.sign_event_id(
+            event_id, signing.private_key_from_hex(private_key_hex)
         )
-        return sig.hex()
 
     def calc_event_id(
         self,
@@ -38,129 +91,737 @@ class Event:
         tags: list,
         content: str,
     ) -> str:
-        data = [0, public_key, created_at, kind_number, tags, content]
-        data_str = json.dumps(data, separators=(",", ":"), ensure_ascii=False)
-        return hashlib.sha256(data_str.encode("UTF-8")).hexdigest()
+        return signing.calc_event_id(public_key, created_at, kind_number, tags, content)
 
-    def create_event(self, content: str, kind: int, tags: list):
-        public_key = self.controller.public_key.get()
-        private_key_hex = self.controller.private_key.get()
+    def create_event(self, content: str, kind: int, tags: list, verify=True):
+        public_key = self.public_key
+        private_key_hex = self.private_key_hex
         created_at = int(time.time())
-        event_id = self.calc_event_id(public_key, created_at, kind, tags, content)
-        signature_hex = self.sign_event_id(event_id, private_key_hex)
-        try:
-            self.verify_signature(event_id, public_key, signature_hex)
-        except Exception as exc:
-            self.print_color(f"Error verifying sig: {exc}", "color31")
-            return
-        event_data = {
-            "id": event_id,
-            "pubkey": public_key,
-            "kind": kind,
-            "created_at": created_at,
-            "tags": tags,
-            "content": content,
-            "sig": signature_hex,
-        }
+        event_data = signing.build_event(
+            signing.private_key_from_hex(private_key_hex),
+            public_key,
+            created_at,
+            content,
+            kind,
+            tags,
+        )
+        if verify:
+            try:
+                self.verify_signature(event_data["id"], public_key, event_data["sig"])
+            except Exception as exc:
+                self.log(f"Error verifying sig: {exc}", ERROR)
+                return
         return event_data
 
+    def create_events(
+        self, specs, workers=None, verify_sample=VERIFY_SAMPLE, pool=None
+    ):
+        # Batch version of create_event for (content, kind, tags) specs: the
+        # key is parsed once per worker process and only a sample of the
+        # signatures is checked. pool: one from signing_pool() to reuse
+        events = signing.build_events(
+            self.private_key_hex,
+            self.public_key,
+            specs,
+            int(time.time()),
+            workers=workers,
+            pool=pool,
+        )
+        for event_data in signing.sample_for_verification(events, verify_sample):
+            try:
+                self.verify_signature(
+                    event_data["id"], self.public_key, event_data["sig"]
+                )
+            except Exception as exc:
+                self.log(f"Error verifying sig: {exc}", ERROR)
+        return events
+
     def verify_signature(self, event_id: str, pubkey: str, sig: str) -> bool:
         try:
-            pub_key = secp256k1.PublicKey(bytes.fromhex("02" + pubkey), True)
-            result = pub_key.schnorr_verify(
-                bytes.fromhex(event_id), bytes.fromhex(sig), None, raw=True
-            )
+            result = signing.verify_event_sig(event_id, pubkey, sig)
             if result:
-                self.print_color(
-                    f"Verification successful for event: {event_id}", "color32"
+                self.log(
+                    f"Verification successful for event: {event_id}", INFO
                 )
                 return True
             else:
-                self.print_color(
-                    f"Verification failed for event: {event_id}", "color31"
+                self.log(
+                    f"Verification failed for event: {event_id}", ERROR
                 )
                 return False
         except (ValueError, TypeError) as e:
-            self.print_color(
-                f"Error verifying signature for event {event_id}: {e}", "color31"
+            self.log(
+                f"Error verifying signature for event {event_id}: {e}", ERROR
             )
             return False
 
-    async def send_event(self, content, kind, tags):
+    async def send_event(self, content, kind, tags, relay_timeout=10):
         try:
             event_data = self.create_event(content, kind, tags)
-            for ws_relay in self.relays:
-                async with websockets.connect(ws_relay) as ws:
-                    event_json = ("EVENT", event_data)
-                    self.print_color(f"Sending event:\n{event_json}", "color32")
-                    self.print_color(f"to {ws_relay}", "color32")
-                    await ws.send(json.dumps(event_json))
-                    response = await asyncio.wait_for(ws.recv(), timeout=10)
-                    self.print_color(
-                        f"Response from {ws_relay} is :\n{response}", "color33"
-                    )
         except Exception as exc:
-            self.print_color(f"Error in sending event: {exc}", "color31")
+            self.log(f"Error in sending event: {exc}", ERROR)
+            return
+        if event_data is None:
+            return
+        # Fan out to every relay at once, so a broadcast costs the slowest
+        # relay rather than the sum of all of them
+        results = await asyncio.gather(
+            *(
+                asyncio.wait_for(
+                    self._send_to_relay(relay, event_data), timeout=relay_timeout
+                )
+                for relay in self.relays
+            ),
+            return_exceptions=True,
+        )
+        for relay, result in zip(self.relays, results):
+            if isinstance(result, asyncio.TimeoutError):
+                self.log(
+                    f"Error in sending event: no OK from {relay} "
+                    f"within {relay_timeout}s",
+                    ERROR,
+                )
+            elif isinstance(result, Exception):
+                self.log(f"Error in sending event to {relay}: {result}", ERROR)
+            else:
+                self.log(f"Response from {relay} is :\n{result}", INFO)
+        # relay -> raw OK frame, or the exception that relay failed with
+        return dict(zip(self.relays, results))
 
-    async def query_relays(self, query_dict, timeout=5):
-        for relay in self.relays:
+    async def queue_event(self, content, kind, tags, outbox):
+        # Returns once the signed event is on disk in the outbox, whose
+        # flusher delivers it and keeps retrying relays that are down
+        try:
+            event_data = self.create_event(content, kind, tags)
+        except Exception as exc:
+            self.log(f"Error in queueing event: {exc}", ERROR)
+            return
+        if event_data is None:
+            return
+        outbox.enqueue(event_data, self.relays)
+        self.log(
+            f"Queued event {event_data['id']} for {len(self.relays)} relay(s)", INFO
+        )
+        return event_data["id"]
+
+    async def _send_to_relay(self, relay, event_data):
+        event_json = ("EVENT", event_data)
+
+        async def exchange(ws):
+            self.log(f"Sending event:\n{event_json}", INFO)
+            self.log(f"to {relay}", INFO)
+            sent_at = time.perf_counter()
+            await self._send(ws, relay, protocol.encode(*event_json))
+            response = await self._recv_ok(ws, relay, event_data["id"])
+            self.metrics.observe(relay, "send_to_ok", time.perf_counter() - sent_at)
+            return response
+
+        try:
+            return await get_pool().run(relay, exchange)
+        finally:
+            # Cached lookups may not show what was just sent
+            query_cache.invalidate(relay)
+
+    async def _recv_ok(self, ws, relay, event_id):
+        # Pooled sockets may still carry frames from an earlier exchange,
+        # skip anything that isn't the OK for this event
+        while True:
+            response = await self._recv(ws, relay)
             try:
-                async with websockets.connect(relay) as ws:
-                    query_ws = json.dumps(("REQ", "nostpy_client", query_dict))
-                    await ws.send(query_ws)
-                    self.print_color(
-                        f"Query sent to relay {relay}:\n{query_ws}", "color32"
-                    )
+                message = protocol.decode(response)
+            except protocol.ProtocolError:
+                continue
+            if isinstance(message, protocol.OkMessage) and message.event_id == event_id:
+                return response
 
-                    responses_received = 0
-                    start_time = time.time()
-                    response_limit = query_dict.get("limit", 100)
-                    response_list = []
+    def signing_pool(self, workers=None):
+        return signing.signing_pool(self.private_key_hex, workers)
 
-                    while (
-                        responses_received < response_limit
-                        and (time.time() - start_time) < timeout
-                    ):
+    async def send_bulk(
+        self, specs, window=BULK_WINDOW, ok_timeout=10, on_progress=None, pool=None
+    ):
+        # specs is an iterable of (content, kind, tags); every relay gets
+        # the whole batch pipelined over a single connection
+        specs = list(specs)
+        return await self.send_planned(
+            {relay: specs for relay in self.relays},
+            window,
+            ok_timeout,
+            on_progress,
+            pool,
+        )
+
+    async def send_planned(
+        self, plan, window=BULK_WINDOW, ok_timeout=10, on_progress=None, pool=None
+    ):
+        # plan maps each relay to its own list of specs; a spec wanted by
+        # several relays is signed once and the same event sent to each,
+        # a spec listed twice for one relay is sent to it once
+        unique = {}
+        for specs in plan.values():
+            for spec in specs:
+                unique.setdefault(protocol.dumps(spec), spec)
+        # Signing is CPU bound, keep it off the event loop
+        loop = asyncio.get_event_loop()
+        events = await loop.run_in_executor(
+            None, lambda: self.create_events(list(unique.values()), pool=pool)
+        )
+        by_spec = dict(zip(unique, events))
+        relays = list(plan)
+        batches = [
+            list({protocol.dumps(spec): None for spec in plan[relay]})
+            for relay in relays
+        ]
+        batches = [[by_spec[key] for key in batch] for batch in batches]
+        results = await asyncio.gather(
+            *(
+                self._pipeline_to_relay(relay, batch, window, ok_timeout, on_progress)
+                for relay, batch in zip(relays, batches)
+            ),
+            return_exceptions=True,
+        )
+        report = {}
+        for relay, batch, result in zip(relays, batches, results):
+            if isinstance(result, Exception):
+                self.log(f"Bulk send to {relay} failed: {result}", ERROR)
+                result = {"accepted": 0, "rejected": 0, "failed": len(batch)}
+            report[relay] = result
+            self.log(
+                f"Bulk send to {relay}: {result['accepted']} accepted, "
+                f"{result['rejected']} rejected, {result['failed']} failed",
+                WARNING if result["rejected"] or result["failed"] else INFO,
+            )
+        return report
+
+    async def deliver(
+        self, relay, events, on_result=None, window=BULK_WINDOW, ok_timeout=10
+    ):
+        # Already signed events to one relay; on_result(event_id, outcome) is
+        # called on the loop with the OkMessage, or the exception if none came
+        return await self._pipeline_to_relay(
+            relay, events, window, ok_timeout, None, on_result
+        )
+
+    async def _pipeline_to_relay(
+        self, relay, events, window, ok_timeout, on_progress, on_result=None
+    ):
+        # OKs are matched on event id, one waiter per id: an event listed
+        # twice is sent once
+        events = list({event_data["id"]: event_data for event_data in events}.values())
+
+        async def exchange(ws):
+            loop = asyncio.get_event_loop()
+            pending = {}
+            sent_at = {}
+            slots = asyncio.Semaphore(window)
+            summary = {"accepted": 0, "rejected": 0, "failed": 0}
+
+            async def read_oks():
+                # OKs can come back in any order, match them on event id
+                try:
+                    while True:
+                        response = await self._recv(ws, relay)
                         try:
-                            response = await asyncio.wait_for(ws.recv(), timeout=1)
-                            self.print_color(
-                                f"Response from {relay}:\n{response}", "color32"
+                            message = protocol.decode(response)
+                        except protocol.ProtocolError:
+                            continue
+                        if not isinstance(message, protocol.OkMessage):
+                            continue
+                        waiter = pending.pop(message.event_id, None)
+                        if waiter and not waiter.done():
+                            self.metrics.observe(
+                                relay,
+                                "send_to_ok",
+                                time.perf_counter() - sent_at.pop(message.event_id),
                             )
-                            if response[0] != "EOSE":
-                                response_list.append(response)
-                                responses_received += 1
-                            # self.update_treeview(response_list)
-
-                        except asyncio.TimeoutError:
-                            self.print_color(
-                                "No response within 1 second, continuing...", "color31"
-                            )
-                            break
-                    self.update_treeview(response_list)
-            except Exception as exc:
-                self.print_color(
-                    f"Exception is {str(exc)}, error querying {relay}", "color31"
-                )
+                            waiter.set_result(message)
+                except Exception as exc:
+                    for waiter in pending.values():
+                        if not waiter.done():
+                            waiter.set_exception(exc)
+
+            async def await_ok(event_id, waiter):
+                try:
+                    message = await asyncio.wait_for(waiter, timeout=ok_timeout)
+                    if message.accepted:
+                        summary["accepted"] += 1
+                    else:
+                        summary["rejected"] += 1
+                        self.log(
+                            f"{relay} rejected {event_id}: {message.message}",
+                            ERROR,
+                        )
+                    if on_result:
+                        on_result(event_id, message)
+                except Exception as exc:
+                    pending.pop(event_id, None)
+                    sent_at.pop(event_id, None)
+                    summary["failed"] += 1
+                    self.log(
+                        f"No OK from {relay} for {event_id}: {str(exc) or 'timeout'}",
+                        ERROR,
+                    )
+                    if on_result:
+                        on_result(event_id, exc)
+                finally:
+                    slots.release()
+                    if on_progress:
+                        done = sum(summary.values())
+                        self._on_ui(on_progress, relay, done, len(events))
+
+            reader = asyncio.ensure_future(read_oks())
+            waiters = []
+            try:
+                for event_data in events:
+                    await slots.acquire()
+                    waiter = loop.create_future()
+                    pending[event_data["id"]] = waiter
+                    sent_at[event_data["id"]] = time.perf_counter()
+                    await self._send(ws, relay, protocol.encode("EVENT", event_data))
+                    waiters.append(
+                        asyncio.ensure_future(await_ok(event_data["id"], waiter))
+                    )
+                await asyncio.gather(*waiters)
+            finally:
+                reader.cancel()
+                for task in waiters:
+                    task.cancel()
+            return summary
 
-    def update_treeview(self, response_string):
         try:
-            for item in response_string:
-                if item[0] == "EOSE":
-                    return
-                response = ast.literal_eval(item)
-                data = response[2]
-
-                self.treeview.insert(
-                    "",
-                    "end",
-                    values=(
-                        data.get("client_pub", ""),
-                        data.get("kind", ""),
-                        data.get("allowed", ""),
-                        data.get("note_id", "")
-                        # item.get('content', '')
-                    ),
+            return await get_pool().run(relay, exchange)
+        finally:
+            query_cache.invalidate(relay)
+
+    async def query_relays(
+        self,
+        query_dict,
+        timeout=5,
+        on_batch=None,
+        store=None,
+        cache=None,
+    ):
+        # Without an explicit "limit" the relay is paged through with until
+        # cursors until the whole set is fetched; on_batch gets the merged
+        # records that changed as each batch arrives. With a store, each
+        # relay is only asked for records since its last sync and every
+        # batch is written to the store. With a cache (filters.QueryCache) a
+        # relay that answered the same filter recently isn't asked again
+        merger = RecordMerger()
+        emit = self._make_emit(merger, on_batch, store)
+
+        results = await asyncio.gather(
+            *(
+                self._sync_relay(relay, query_dict, timeout, emit, store, cache)
+                for relay in self.relays
+            ),
+            return_exceptions=True,
+        )
+        for relay, result in zip(self.relays, results):
+            if isinstance(result, BaseException):
+                self.log(
+                    f"Exception is {str(result) or type(result).__name__}, "
+                    f"error querying {relay}",
+                    ERROR,
+                )
+            else:
+                self.log(f"Received {result} records from {relay}", INFO)
+        return merger.records()
+
+    async def stream_query(self, query_dict, emit, timeout=5):
+        # The raw records go to emit(relay, records) on the loop as pages
+        # arrive, nothing is merged or kept here. Returns {relay: records
+        # received or exception}
+        results = await asyncio.gather(
+            *(
+                self._query_relay(relay, query_dict, timeout, emit)
+                for relay in self.relays
+            ),
+            return_exceptions=True,
+        )
+        totals = {}
+        for relay, result in zip(self.relays, results):
+            if isinstance(result, BaseException):
+                self.log(
+                    f"Exception is {str(result) or type(result).__name__}, "
+                    f"error querying {relay}",
+                    ERROR,
+                )
+                totals[relay] = result
+                continue
+            total, complete = result
+            if not complete:
+                self.log(f"{relay} didn't finish the query", WARNING)
+            totals[relay] = total
+        return totals
+
+    async def fetch_state(self, query_dict, timeout=5):
+        # Unlike query_relays nothing is merged across relays, each relay's
+        # own records come back separately: {relay: records or exception}.
+        # A partial answer is an IncompleteQuery, not a short list
+        async def fetch(relay):
+            merger = RecordMerger()
+            total, complete = await self._query_relay(
+                relay, query_dict, timeout, lambda relay, records: merger.add(records)
+            )
+            if not complete:
+                raise IncompleteQuery(
+                    f"{relay} sent {total} records but didn't finish the query"
+                )
+            return merger.records()
+
+        results = await asyncio.gather(
+            *(fetch(relay) for relay in self.relays), return_exceptions=True
+        )
+        for relay, result in zip(self.relays, results):
+            if isinstance(result, BaseException):
+                self.log(
+                    f"Exception is {str(result) or type(result).__name__}, "
+                    f"error querying {relay}",
+                    ERROR,
+                )
+        return dict(zip(self.relays, results))
+
+    def _make_emit(self, merger, on_batch, store):
+        def emit(relay, records):
+            if store is not None:
+                store.save(relay, records)
+            changed = merger.add(records)
+            if changed and on_batch:
+                self._on_ui(on_batch, changed)
+
+        return emit
+
+    def _since_last_sync(self, query_dict, relay, store):
+        if store is None or "since" in query_dict:
+            return query_dict
+        last_synced = store.last_synced(relay)
+        if last_synced is None:
+            return query_dict
+        return dict(query_dict, since=last_synced)
+
+    async def _sync_relay(self, relay, query_dict, timeout, emit, store, cache):
+        query = self._since_last_sync(query_dict, relay, store)
+        if store is None:
+            total, _ = await self._query_cached(relay, query, timeout, emit, cache)
+            return total
+        newest = 0
+
+        def track(relay, records):
+            nonlocal newest
+            for record in records:
+                newest = max(newest, record.get("created_at") or 0)
+            emit(relay, records)
+
+        total, complete = await self._query_cached(relay, query, timeout, track, cache)
+        # The cursor only moves after a full sync, every page ended by EOSE
+        if complete and "limit" not in query and newest:
+            store.mark_synced(relay, newest)
+        return total
+
+    async def _query_cached(self, relay, query_dict, timeout, emit, cache):
+        if cache is None:
+            return await self._query_relay(relay, query_dict, timeout, emit)
+        records = cache.get(relay, query_dict)
+        if records is not None:
+            self.log(f"{len(records)} records for {relay} from cache", INFO)
+            emit(relay, records)
+            return len(records), True
+        fetched = []
+
+        def collect(relay, records):
+            fetched.extend(records)
+            emit(relay, records)
+
+        total, complete = await self._query_relay(relay, query_dict, timeout, collect)
+        # A partial answer would be served as the whole result until the ttl
+        if complete:
+            cache.put(relay, query_dict, fetched)
+        return total, complete
+
+    async def _query_relay(self, relay, query_dict, timeout, emit, cap=None):
+        # (records received, whether that is everything the query matches:
+        # each page ended in EOSE and the last one came back short). Pages
+        # overlap by a second, so records can be emitted twice
+        paginate = "limit" not in query_dict
+        page_query = dict(query_dict)
+        if paginate:
+            page_query["limit"] = PAGE_SIZE
+
+        session = get_session(relay)
+        total = 0
+        complete = False
+        while True:
+            count, oldest, page_complete = await self._query_page(
+                session, page_query, timeout, emit
+            )
+            total += count
+            if not page_complete or (cap is not None and total >= cap):
+                break
+            if not paginate or count < PAGE_SIZE:
+                complete = True
+                break
+            if not oldest:
+                break
+            if oldest == page_query.get("until"):
+                # A full page all from one second, a bulk send signs its
+                # whole batch with the same created_at. Paging can't get
+                # past it, so that second is fetched whole before stepping
+                # over it (until is inclusive)
+                second = dict(query_dict, since=oldest, until=oldest)
+                count, _, page_complete = await self._query_page(
+                    session, second, timeout, emit
                 )
+                total += count
+                if not page_complete or (cap is not None and total >= cap):
+                    break
+                oldest -= 1
+            page_query = dict(page_query, until=oldest)
+        return total, complete
+
+    async def _query_page(self, session, query, timeout, emit):
+        # Each page is its own subscription on the relay's shared socket,
+        # closed again on the way out whether or not EOSE arrived
+        relay = session.relay
+        sent_at = time.perf_counter()
+        start_time = time.time()
+        count = 0
+        oldest = None
+        batch = []
+        complete = False
+
+        async with await session.subscribe(query) as subscription:
+            self.log(
+                f"Query {subscription.sub_id} sent to relay {relay}:\n"
+                f"{protocol.encode('REQ', subscription.sub_id, query)}",
+                INFO,
+            )
+            while (time.time() - start_time) < timeout:
+                try:
+                    message = await subscription.next(timeout=1)
+                except asyncio.TimeoutError:
+                    self.log("No response within 1 second, continuing...", ERROR)
+                    break
+                self.log(f"Response from {relay}:\n{message}", DEBUG)
+                if isinstance(message, protocol.EventMessage):
+                    if not count:
+                        self.metrics.observe(
+                            relay, "first_event", time.perf_counter() - sent_at
+                        )
+                    count += 1
+                    created_at = message.event.get("created_at")
+                    if created_at is not None and (
+                        oldest is None or created_at < oldest
+                    ):
+                        oldest = created_at
+                    batch.append(message.event)
+                    if len(batch) >= STREAM_BATCH:
+                        self.metrics.count(relay, events=len(batch))
+                        emit(relay, batch)
+                        batch = []
+                elif isinstance(message, protocol.EoseMessage):
+                    self.metrics.observe(relay, "eose", time.perf_counter() - sent_at)
+                    complete = True
+                    break
+                elif isinstance(message, protocol.NoticeMessage):
+                    self.log(f"Notice from {relay}: {message.message}", WARNING)
+                elif isinstance(message, protocol.ClosedMessage):
+                    self.log(f"{relay} closed the query: {message.message}", ERROR)
+                    break
+        if batch:
+            self.metrics.count(relay, events=len(batch))
+            emit(relay, batch)
+        return count, oldest, complete
+
+    async def count_events(
+        self, pubkey, kinds=PREVIEW_KINDS, timeout=5, scan_cap=SCAN_CAP
+    ):
+        # Sizes a delete_pub before it is sent: {relay: {"method", "total",
+        # "approximate", "by_kind"}}, or the exception for that relay
+        results = await asyncio.gather(
+            *(
+                self._count_relay(relay, pubkey, kinds, timeout, scan_cap)
+                for relay in self.relays
+            ),
+            return_exceptions=True,
+        )
+        report = {}
+        for relay, result in zip(self.relays, results):
+            if isinstance(result, BaseException):
+                self.log(
+                    f"Exception is {str(result) or type(result).__name__}, "
+                    f"error counting on {relay}",
+                    ERROR,
+                )
+            else:
+                self.log(
+                    f"{relay} has {result['total']} events from {pubkey} "
+                    f"(by {result['method']})",
+                    INFO,
+                )
+            report[relay] = result
+        return report
+
+    async def _count_relay(self, relay, pubkey, kinds, timeout, scan_cap):
+        session = get_session(relay)
+        author = {"authors": [pubkey]}
+        total = await session.count(author, timeout=timeout)
+        if total is None:
+            self.log(f"{relay} doesn't answer COUNT, scanning instead", WARNING)
+            return await self._scan_count(relay, author, timeout, scan_cap)
+        # NIP-45 only gives a total, so the breakdown is one COUNT per kind,
+        # all in flight at once on the same socket
+        counts = await asyncio.gather(
+            *(
+                session.count(dict(author, kinds=[kind]), timeout=timeout)
+                for kind in kinds
+            )
+        )
+        by_kind = {
+            kind: result.count
+            for kind, result in zip(kinds, counts)
+            if result is not None and result.count
+        }
+        # Kinds whose COUNT got no answer are somewhere in the remainder,
+        # which then can't be called "other"
+        unknown_kinds = [
+            kind for kind, result in zip(kinds, counts) if result is None
+        ]
+        rest = total.count - sum(by_kind.values())
+        if rest > 0:
+            by_kind["unknown" if unknown_kinds else "other"] = rest
+        return {
+            "method": "count",
+            "total": total.count,
+            "approximate": total.approximate,
+            "by_kind": by_kind,
+            "unknown_kinds": unknown_kinds,
+        }
+
+    async def _scan_count(self, relay, author, timeout, scan_cap):
+        # Events are tallied as they stream past and only their ids kept,
+        # pages overlap by a second so the same event can arrive twice
+        by_kind = Counter()
+        seen = set()
+
+        def emit(relay, records):
+            for record in records:
+                event_id = record_id(record)
+                if event_id not in seen:
+                    seen.add(event_id)
+                    by_kind[record.get("kind")] += 1
+
+        fetched, _ = await self._query_relay(
+            relay, author, timeout, emit, cap=scan_cap
+        )
+        return {
+            "method": "scan",
+            "total": len(seen),
+            "approximate": fetched >= scan_cap,
+            "by_kind": dict(by_kind),
+            "unknown_kinds": [],
+        }
+
+    async def live_tail(
+        self, query_dict, on_batch=None, store=None, retry_delay=1, max_retry_delay=60
+    ):
+        # Keeps a subscription open on every relay and pushes new records to
+        # on_batch as they are published, until the task is cancelled.
+        # Dropped connections are resubscribed with backoff from the newest
+        # created_at seen, so nothing published in between is missed
+        merger = RecordMerger()
+        emit = self._make_emit(merger, on_batch, store)
+        await asyncio.gather(
+            *(
+                self._tail_relay(
+                    relay, query_dict, store, emit, retry_delay, max_retry_delay
+                )
+                for relay in self.relays
+            )
+        )
+
+    async def _tail_relay(
+        self, relay, query_dict, store, emit, retry_delay, max_retry_delay
+    ):
+        query = dict(self._since_last_sync(query_dict, relay, store))
+        query.setdefault("since", int(time.time()))
+        query.pop("limit", None)
+        delay = retry_delay
+        while True:
+            try:
+                subscription = await get_session(relay).subscribe(query)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                self.log(
+                    f"Live tail of {relay} failed to subscribe: {exc}, "
+                    f"retrying in {delay}s",
+                    ERROR,
+                )
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, max_retry_delay)
+                continue
+            self.log(f"Live tail {subscription.sub_id} open on {relay}", INFO)
+            # Leaving the block, by cancellation too, sends the CLOSE
+            async with subscription:
+                async for message in subscription:
+                    if isinstance(message, protocol.EventMessage):
+                        delay = retry_delay
+                        created_at = message.event.get("created_at")
+                        if created_at is not None and created_at > query["since"]:
+                            query["since"] = created_at
+                        self.metrics.count(relay, events=1)
+                        emit(relay, [message.event])
+                    elif isinstance(message, protocol.NoticeMessage):
+                        self.log(f"Notice from {relay}: {message.message}", WARNING)
+            if subscription.closed_reason != CONNECTION_LOST:
+                self.log(
+                    f"{relay} closed the live tail: {subscription.closed_reason}", ERROR
+                )
+                return
+            self.log(f"Lost {relay}, resubscribing in {delay}s", WARNING)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, max_retry_delay)
+
+
+def split_relays(relay_text: str) -> list:
+    return [relay for relay in relay_text.replace(",", " ").split() if relay]
+
+
+def record_id(record: dict) -> str:
+    # note_id is the note being moderated, shared by every record about it,
+    # so without an event id only the whole record tells two apart
+    return record.get("id") or json.dumps(record, sort_keys=True)
+
+
+class RecordMerger:
+    # The same record can come back from several relays (and from the
+    # overlap between pages): keep only the newest record per moderation
+    # target, a repeat of one already held is never newer so it drops out
+    # there. Records without a target go by event id instead. Records are
+    # held as compact AllowlistRecords, which add() and records() hand back
+    def __init__(self):
+        self._by_key = {}
+
+    def add(self, records) -> list:
+        changed = {}
+        for raw in records:
+            record = AllowlistRecord.from_dict(raw)
+            key = record.key
+            current = self._by_key.get(key)
+            if current is None or (record.created_at or 0) > (
+                current.created_at or 0
+            ):
+                self._by_key[key] = record
+                changed[key] = record
+        return list(changed.values())
+
+    def records(self) -> list:
+        return list(self._by_key.values())
+
 
-        except json.JSONDecodeError:
-            self.print_color(f"Error decoding JSON response: {response[2]}", "color31")
\ No newline at end of file
+def merge_records(record_lists) -> list:
+    merger = RecordMerger()
+    for records in record_lists:
+        merger.add(records)
+    return merger.records()
@@ -0,0 +1,157 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from nostpy_gui.records import HEX64, MODERATION_KIND
+
+CACHE_ENTRIES = 256
+CACHE_TTL = 120  # seconds a cached lookup is served without asking the relay
+CACHE_MAX_RECORDS = 10000  # bigger results aren't lookups, they aren't cached
+
+# Tag values that are ids or pubkeys, checked like authors
+HEX_TAGS = ("e", "p")
+
+
+class FilterError(ValueError):
+    pass
+
+
+def split_values(text) -> list:
+    return text.replace(",", " ").split()
+
+
+def parse_time(text):
+    # Unix seconds, or a local date/time like 2024-05-01 or 2024-05-01 13:30
+    text = text.strip()
+    if not text:
+        return None
+    if text.isdigit():
+        return int(text)
+    for layout in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d"):
+        try:
+            return int(datetime.strptime(text, layout).timestamp())
+        except ValueError:
+            continue
+    raise FilterError(f"{text!r} is neither unix seconds nor YYYY-MM-DD [HH:MM]")
+
+
+def parse_tags(text) -> dict:
+    # "p:<hex> t:spam e:<hex>" into {"p": [...], "t": [...], "e": [...]}
+    tags = {}
+    for item in split_values(text):
+        letter, sep, value = item.partition(":")
+        if not sep or len(letter) != 1 or not letter.isalpha() or not value:
+            raise FilterError(f"tag filter {item!r} should look like p:<value>")
+        tags.setdefault(letter, []).append(value)
+    return tags
+
+
+def _hex_values(values, what) -> list:
+    values = [value.lower() for value in values]
+    for value in values:
+        if not HEX64.match(value):
+            raise FilterError(f"{what} {value!r} is not 64 hex characters")
+    return values
+
+
+def build_filter(
+    kinds=(MODERATION_KIND,),
+    authors=(),
+    tags=None,
+    since=None,
+    until=None,
+    limit=None,
+) -> dict:
+    # A NIP-01 filter for the relay to narrow down on its side, already
+    # normalized so equal filters compare (and cache) equal
+    query = {"kinds": list(kinds)}
+    if authors:
+        query["authors"] = _hex_values(authors, "author")
+    for letter, values in (tags or {}).items():
+        if letter in HEX_TAGS:
+            values = _hex_values(values, f"#{letter} value")
+        query[f"#{letter}"] = list(values)
+    if since is not None:
+        query["since"] = int(since)
+    if until is not None:
+        query["until"] = int(until)
+    if since is not None and until is not None and since > until:
+        raise FilterError("since is after until")
+    if limit is not None:
+        if int(limit) <= 0:
+            raise FilterError("limit has to be positive")
+        query["limit"] = int(limit)
+    return normalize_filter(query)
+
+
+def normalize_filter(query) -> dict:
+    # Sorted, de-duplicated list values; the order of keys doesn't matter
+    # to filter_key either
+    return {
+        key: sorted(set(value)) if isinstance(value, list) else value
+        for key, value in query.items()
+    }
+
+
+def filter_key(query) -> str:
+    return json.dumps(normalize_filter(query), sort_keys=True, separators=(",", ":"))
+
+
+class QueryCache:
+    # LRU of recent query results, keyed by relay and normalized filter, so
+    # looking the same pubkey up again during a session costs no round trip.
+    # Entries expire after ttl; sending to a relay drops its entries since
+    # the allowlist may just have changed
+    def __init__(
+        self, max_entries=CACHE_ENTRIES, ttl=CACHE_TTL, max_records=CACHE_MAX_RECORDS
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_records = max_records
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, relay, query):
+        key = (relay, filter_key(query))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, relay, query, records):
+        if len(records) > self.max_records:
+            return
+        key = (relay, filter_key(query))
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, list(records))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, relay=None):
+        with self._lock:
+            if relay is None:
+                self._entries.clear()
+                return
+            for key in [key for key in self._entries if key[0] == relay]:
+                del self._entries[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+query_cache = QueryCache()
@@ -0,0 +1,216 @@
+import asyncio
+import json
+import threading
+import time
+
+PROBE_INTERVAL = 30  # seconds between probes of a healthy relay
+PROBE_TIMEOUT = 5
+BACKOFF_BASE = 5  # seconds a relay is skipped after its first failure
+BACKOFF_MAX = 300
+
+UNKNOWN = "unknown"
+UP = "up"
+DOWN = "down"
+
+
+class RelayUnavailable(ConnectionError):
+    pass
+
+
+class RelayHealth:
+    def __init__(self):
+        self.status = UNKNOWN
+        self.failures = 0
+        self.retry_at = 0.0
+        self.connect_ms = None
+        self.ping_ms = None
+        self.info = None
+        self.last_error = None
+        self.checked_at = None
+
+
+def nip11_url(relay) -> str:
+    if relay.startswith("wss://"):
+        return "https://" + relay[len("wss://") :]
+    if relay.startswith("ws://"):
+        return "http://" + relay[len("ws://") :]
+    return relay
+
+
+def fetch_nip11(relay, timeout=PROBE_TIMEOUT):
+    # Blocking, run it in an executor. urllib is imported here to keep it
+    # off the startup path
+    import urllib.request
+
+    request = urllib.request.Request(
+        nip11_url(relay), headers={"Accept": "application/nostr+json"}
+    )
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return json.loads(response.read().decode("utf-8"))
+
+
+class HealthRegistry:
+    # Circuit breaker per relay: a failed connect or probe marks the relay
+    # down and every connect to it fails fast with RelayUnavailable until
+    # its backoff runs out, doubling on each further failure. run() probes
+    # the tracked relays in the background so a dead relay is usually known
+    # before anything tries to use it
+    def __init__(
+        self,
+        probe_interval=PROBE_INTERVAL,
+        backoff_base=BACKOFF_BASE,
+        backoff_max=BACKOFF_MAX,
+    ):
+        self.probe_interval = probe_interval
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.relays = []
+        self._health = {}
+        self._lock = threading.Lock()
+        self._wake = None
+        self._loop = None
+
+    def _relay(self, relay):
+        health = self._health.get(relay)
+        if health is None:
+            health = self._health[relay] = RelayHealth()
+        return health
+
+    def track(self, relays):
+        # Relays for run() to probe; callable from any thread. Whatever was
+        # known about relays no longer in the list is dropped
+        self.relays = list(relays)
+        with self._lock:
+            for relay in [relay for relay in self._health if relay not in self.relays]:
+                del self._health[relay]
+        if self._wake is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    def check(self, relay):
+        with self._lock:
+            health = self._health.get(relay)
+            if health is None or health.status != DOWN:
+                return
+            wait = health.retry_at - time.monotonic()
+            error = health.last_error
+        if wait > 0:
+            raise RelayUnavailable(
+                f"{relay} is down ({error}), skipped for another {wait:.0f}s"
+            )
+
+    def record_success(self, relay, connect_s=None):
+        with self._lock:
+            health = self._relay(relay)
+            health.status = UP
+            health.failures = 0
+            health.last_error = None
+            health.checked_at = time.monotonic()
+            if connect_s is not None:
+                health.connect_ms = round(connect_s * 1000, 1)
+
+    def record_failure(self, relay, error):
+        with self._lock:
+            health = self._relay(relay)
+            health.status = DOWN
+            health.failures += 1
+            health.last_error = str(error) or type(error).__name__
+            health.checked_at = time.monotonic()
+            backoff = min(
+                self.backoff_base * 2 ** min(health.failures - 1, 16),
+                self.backoff_max,
+            )
+            health.retry_at = time.monotonic() + backoff
+
+    def snapshot(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                relay: {
+                    "status": health.status,
+                    "connect_ms": health.connect_ms,
+                    "ping_ms": health.ping_ms,
+                    "name": (health.info or {}).get("name"),
+                    "software": (health.info or {}).get("software"),
+                    "supported_nips": (health.info or {}).get("supported_nips"),
+                    "last_error": health.last_error,
+                    "retry_in": (
+                        max(0, round(health.retry_at - now))
+                        if health.status == DOWN
+                        else None
+                    ),
+                }
+                for relay, health in self._health.items()
+            }
+
+    def _next_probe(self, relay, now):
+        with self._lock:
+            health = self._health.get(relay)
+            if health is None or health.checked_at is None:
+                return now
+            if health.status == DOWN:
+                return health.retry_at
+            return health.checked_at + self.probe_interval
+
+    async def probe(self, relay):
+        # Connect and ping RTT on a throwaway socket, plus the NIP-11 info
+        # document, which relays may not serve and which doesn't count
+        import websockets
+
+        try:
+            started = time.perf_counter()
+            ws = await asyncio.wait_for(websockets.connect(relay), PROBE_TIMEOUT)
+            connect_s = time.perf_counter() - started
+            try:
+                started = time.perf_counter()
+                pong = await ws.ping()
+                await asyncio.wait_for(pong, PROBE_TIMEOUT)
+                ping_s = time.perf_counter() - started
+            finally:
+                await ws.close()
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            self.record_failure(relay, exc)
+            return
+        self.record_success(relay, connect_s)
+        loop = asyncio.get_event_loop()
+        try:
+            info = await loop.run_in_executor(None, fetch_nip11, relay)
+        except Exception:
+            info = None
+        with self._lock:
+            health = self._relay(relay)
+            health.ping_ms = round(ping_s * 1000, 1)
+            if isinstance(info, dict):
+                health.info = info
+
+    async def run(self):
+        self._loop = asyncio.get_event_loop()
+        self._wake = asyncio.Event()
+        try:
+            while True:
+                self._wake.clear()
+                now = time.monotonic()
+                due = [
+                    relay
+                    for relay in self.relays
+                    if self._next_probe(relay, now) <= now
+                ]
+                if due:
+                    await asyncio.gather(*(self.probe(relay) for relay in due))
+                    continue
+                next_probe = min(
+                    (self._next_probe(relay, now) for relay in self.relays),
+                    default=now + self.probe_interval,
+                )
+                try:
+                    await asyncio.wait_for(
+                        self._wake.wait(), max(0.5, next_probe - now)
+                    )
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self._wake = None
+
+
+registry = HealthRegistry()
@@ -1,4 +1,7 @@
 from tkinter import ttk
+from nostpy_gui.health import DOWN, UP, registry
+
+REFRESH_MS = 2000
 
 
 class LandingPage(ttk.Frame):
@@ -20,7 +23,7 @@ class LandingPage(ttk.Frame):
         )  # Adjust the width as needed
         self.public_key_entry.pack(pady=5)
 
-        ttk.Label(self, text="Relay URL").pack(pady=5)
+        ttk.Label(self, text="Relay URL(s), comma separated").pack(pady=5)
         self.relay_url_entry = ttk.Entry(
             self, textvariable=self.controller.relay_url, width=60
         )  # Adjust the width as needed
@@ -30,6 +33,22 @@ class LandingPage(ttk.Frame):
             self, text="Save Keys and Relay", command=self.save_keys_and_relay
         ).pack(pady=20)
 
+        # Relay status from the background prober, see health.py
+        self.health_view = ttk.Treeview(
+            self,
+            columns=("relay", "status", "connect_ms", "ping_ms", "name"),
+            show="headings",
+            height=3,
+        )
+        for column in ("relay", "status", "connect_ms", "ping_ms", "name"):
+            self.health_view.heading(column, text=column)
+            self.health_view.column(column, width=90)
+        self.health_view.column("relay", width=260)
+        self.health_view.tag_configure(UP, foreground="#55FF55")
+        self.health_view.tag_configure(DOWN, foreground="#FF5555")
+        self.health_view.pack(fill="x", padx=10)
+        self._refresh_job = None
+
         # Add a separator to divide sections
         ttk.Separator(self, orient="horizontal").pack(fill="x", pady=10)
 
@@ -48,12 +67,50 @@ class LandingPage(ttk.Frame):
             text="Query Relay Allowlist",
             command=lambda: controller.show_frame("QueryRelayPage"),
         ).pack(pady=20)
+        ttk.Button(
+            self,
+            text="Relay Metrics",
+            command=lambda: controller.show_frame("MetricsPage"),
+        ).pack(pady=10)
+
+    def on_show(self):
+        self.refresh_health()
+
+    def refresh_health(self):
+        snapshot = registry.snapshot()
+        self.health_view.delete(*self.health_view.get_children())
+        for relay in registry.relays:
+            health = snapshot.get(relay)
+            if health is None:
+                continue
+            status = health["status"]
+            if health["retry_in"] is not None:
+                status = f"{status}, retry in {health['retry_in']}s"
+            self.health_view.insert(
+                "",
+                "end",
+                values=(
+                    relay,
+                    status,
+                    health["connect_ms"] if health["connect_ms"] is not None else "",
+                    health["ping_ms"] if health["ping_ms"] is not None else "",
+                    health["name"] or "",
+                ),
+                tags=(health["status"],),
+            )
+        # Keep refreshing only while the page is on top
+        if self._refresh_job:
+            self.after_cancel(self._refresh_job)
+            self._refresh_job = None
+        if self.controller.current_frame == "LandingPage":
+            self._refresh_job = self.after(REFRESH_MS, self.refresh_health)
 
     def save_keys_and_relay(self):
         # Save the values in the main application (controller)
         self.controller.private_key.set(self.private_key_entry.get())
         self.controller.public_key.set(self.public_key_entry.get())
         self.controller.relay_url.set(self.relay_url_entry.get())
+        self.controller.relays_saved()
 
         # Debugging print statements
         # print("Private Key:", self.controller.private_key.get())
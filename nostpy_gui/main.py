@@ -1,40 +1,186 @@
+import importlib
+import queue
+import time
 import tkinter as tk
+from logging import ERROR, INFO
 from tkinter import ttk, messagebox, colorchooser, simpledialog
-from nostpy_gui.delete import DeleteEventPage
-from nostpy_gui.landing import LandingPage
-from nostpy_gui.manage import ManageRelayPage
-from nostpy_gui.query import QueryRelayPage
+from nostpy_gui.profiling import enabled_by_env, install_tk_hook, profiler
+from nostpy_gui.worker import AsyncWorker
+
+UI_POLL_MS = 20
+# The outbox (and sqlite with it) is opened once the window is up, relay
+# probing starts at the same time
+OUTBOX_START_MS = 1000
+OUTBOX_RESTART_MS = 5000
+HEALTH_START_MS = 1000
+HEARTBEAT_MS = 50
+PROFILE_STOP_MS = 2000
+
+# Pages are imported and built the first time they are shown
+PAGES = {
+    "LandingPage": "nostpy_gui.landing",
+    "ManageRelayPage": "nostpy_gui.manage",
+    "QueryRelayPage": "nostpy_gui.query",
+    "DeleteEventPage": "nostpy_gui.delete",
+    "MetricsPage": "nostpy_gui.metrics_page",
+}
+
+
+class CurrentPageSink:
+    # Background work, like the outbox flusher, logs to whichever page is
+    # showing
+    def __init__(self, app):
+        self.app = app
+
+    def log(self, text, level=INFO):
+        self.app.post_to_ui(self._log, text, level)
+
+    def _log(self, text, level):
+        frame = self.app.frames.get(self.app.current_frame)
+        output = getattr(frame, "output_text", None)
+        if output is not None:
+            output.log(text, level)
 
 
 class DarkModeApp(tk.Tk):
     def __init__(self):
+        # Before any widget exists, so every callback can be timed
+        install_tk_hook(profiler)
         super().__init__()
         self.title("Nostpy Admin GUI")
         self.geometry("800x600")
         self.set_dark_mode()
 
-        container = ttk.Frame(self)
-        container.pack(fill="both", expand=True)
-        container.grid_rowconfigure(0, weight=1)
-        container.grid_columnconfigure(0, weight=1)
+        # Network I/O runs on a long-lived loop in a worker thread, results
+        # come back to Tk through the UI queue drained by after()
+        self.worker = AsyncWorker()
+        self.worker.start()
+        self._ui_queue = queue.Queue()
+        self.after(UI_POLL_MS, self._drain_ui_queue)
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+
+        self.container = ttk.Frame(self)
+        self.container.pack(fill="both", expand=True)
+        self.container.grid_rowconfigure(0, weight=1)
+        self.container.grid_columnconfigure(0, weight=1)
 
         self.private_key = tk.StringVar()
         self.public_key = tk.StringVar()
         self.relay_url = tk.StringVar()
 
         self.frames = {}
-        for F in (LandingPage, ManageRelayPage, QueryRelayPage, DeleteEventPage):
-            page_name = F.__name__
-            frame = F(parent=container, controller=self)
-            self.frames[page_name] = frame
-            frame.grid(row=0, column=0, sticky="nsew")
-
+        self.current_frame = None
+        self._outbox = None
+        self._closing = False
+        self.profiling = tk.BooleanVar(value=False)
         self.create_menu()
+        if enabled_by_env():
+            self.profiling.set(True)
+            self.start_profiling()
         self.show_frame("LandingPage")
+        self.after(OUTBOX_START_MS, self.start_outbox)
+        self.after(HEALTH_START_MS, self.start_health)
+
+    @property
+    def outbox(self):
+        if self._outbox is None:
+            from nostpy_gui.outbox import Outbox
+
+            self._outbox = Outbox()
+        return self._outbox
+
+    def start_outbox(self):
+        # Also resumes delivery of whatever was still queued at the last exit
+        from nostpy_gui.event import Event
+
+        self.run_async(
+            self.outbox.run(Event([], sink=CurrentPageSink(self))),
+            on_done=self.outbox_stopped,
+        )
+
+    def outbox_stopped(self, future):
+        # run() only returns by raising; queued events still have to go out,
+        # so the flusher is started again after a pause
+        if future.cancelled():
+            return
+        exc = future.exception()
+        CurrentPageSink(self).log(
+            f"Outbox flusher stopped ({exc!r}), restarting", ERROR
+        )
+        self.after(OUTBOX_RESTART_MS, self.start_outbox)
+
+    def start_health(self):
+        from nostpy_gui.health import registry
+
+        self.track_relays()
+        self.run_async(registry.run())
+
+    def track_relays(self):
+        from nostpy_gui.event import split_relays
+        from nostpy_gui.health import registry
+
+        registry.track(split_relays(self.relay_url.get()))
+
+    def relays_saved(self):
+        # Called once a relay list is saved, not per keystroke; the new list
+        # is probed and sessions to relays no longer in it are closed
+        from nostpy_gui.event import split_relays
+        from nostpy_gui.subscriptions import prune_sessions
+
+        self.track_relays()
+        self.run_async(prune_sessions(split_relays(self.relay_url.get())))
+
+    def get_frame(self, page_name):
+        frame = self.frames.get(page_name)
+        if frame is None:
+            page_class = getattr(importlib.import_module(PAGES[page_name]), page_name)
+            frame = page_class(parent=self.container, controller=self)
+            self.frames[page_name] = frame
+            frame.grid(row=0, column=0, sticky="nsew")
+        return frame
 
     def show_frame(self, page_name):
-        frame = self.frames[page_name]
+        frame = self.get_frame(page_name)
         frame.tkraise()
+        self.current_frame = page_name
+        if hasattr(frame, "on_show"):
+            frame.on_show()
+
+    def run_async(self, coro, on_done=None):
+        if profiler.active:
+            coro = profiler.wrap_coro(coro)
+        future = self.worker.submit(coro)
+        if on_done:
+            future.add_done_callback(lambda fut: self.post_to_ui(on_done, fut))
+        return future
+
+    def post_to_ui(self, func, *args):
+        self._ui_queue.put((func, args))
+
+    def _drain_ui_queue(self):
+        try:
+            while True:
+                try:
+                    func, args = self._ui_queue.get_nowait()
+                except queue.Empty:
+                    break
+                profiler.call(func, *args)
+        finally:
+            self.after(UI_POLL_MS, self._drain_ui_queue)
+
+    def on_close(self):
+        if self._closing:
+            return
+        self._closing = True
+        if profiler.active:
+            # The window goes once the profile is written
+            self.stop_profiling(lambda paths: self.shutdown())
+            return
+        self.shutdown()
+
+    def shutdown(self):
+        self.worker.stop()
+        self.destroy()
 
     def set_dark_mode(self):
         self.configure(bg="#2E2E2E")
@@ -66,7 +212,7 @@ class DarkModeApp(tk.Tk):
         # File Menu
         file_menu = tk.Menu(menubar, tearoff=0)
         menubar.add_cascade(label="Exit", menu=file_menu)
-        file_menu.add_command(label="Exit", command=self.quit)
+        file_menu.add_command(label="Exit", command=self.on_close)
 
         # Edit Menu
         edit_menu = tk.Menu(menubar, tearoff=0)
@@ -76,6 +222,52 @@ class DarkModeApp(tk.Tk):
         edit_menu.add_command(
             label="Update Keys and Relay", command=self.enter_keys_and_relay
         )
+        edit_menu.add_command(
+            label="Connection Pool Stats", command=self.show_pool_stats
+        )
+        edit_menu.add_command(label="Outbox Status", command=self.show_outbox_status)
+        edit_menu.add_checkbutton(
+            label="Profiling", variable=self.profiling, command=self.toggle_profiling
+        )
+
+    def toggle_profiling(self):
+        if self.profiling.get():
+            self.start_profiling()
+            return
+        self.stop_profiling(
+            lambda paths: messagebox.showinfo(
+                "Profiling", "Profile written to:\n" + "\n".join(paths)
+            )
+        )
+
+    def start_profiling(self):
+        profiler.start()
+        self.run_async(profiler.enable_loop())
+        self._profile_heartbeat(time.perf_counter() + HEARTBEAT_MS / 1000)
+
+    def stop_profiling(self, on_stopped):
+        # The worker's profile has to be disabled from its own thread. Tk
+        # doesn't wait for that, the profile is written once it's done, or
+        # after PROFILE_STOP_MS if the worker is busy, then on_stopped(paths)
+        stopped = []
+
+        def finish(*args):
+            if stopped:
+                return
+            stopped.append(True)
+            paths = profiler.stop()
+            CurrentPageSink(self).log("Profile written to: " + ", ".join(paths))
+            on_stopped(paths)
+
+        self.run_async(profiler.disable_loop(), on_done=finish)
+        self.after(PROFILE_STOP_MS, finish)
+
+    def _profile_heartbeat(self, due):
+        if not profiler.active:
+            return
+        now = time.perf_counter()
+        profiler.heartbeat(max(0.0, now - due))
+        self.after(HEARTBEAT_MS, self._profile_heartbeat, now + HEARTBEAT_MS / 1000)
 
     def clear_output(self):
         for frame in self.frames.values():
@@ -89,12 +281,45 @@ class DarkModeApp(tk.Tk):
                 if hasattr(frame, "change_text_color"):
                     frame.change_text_color(color)
 
+    def show_pool_stats(self):
+        async def pool_stats():
+            from nostpy_gui.pool import get_pool
+
+            return get_pool().stats()
+
+        def show(future):
+            stats = future.result()
+            messagebox.showinfo(
+                "Connection Pool",
+                "\n".join(f"{name}: {value}" for name, value in stats.items()),
+            )
+
+        self.run_async(pool_stats(), on_done=show)
+
+    def show_outbox_status(self):
+        stats = self.outbox.stats()
+        if not stats:
+            messagebox.showinfo("Outbox", "Nothing waiting to be sent")
+            return
+        now = time.time()
+        lines = []
+        for relay, relay_stats in stats.items():
+            lines.append(
+                f"{relay}: {relay_stats['pending']} pending, oldest "
+                f"{now - relay_stats['oldest_queued_at']:.0f}s ago, next try in "
+                f"{max(0, relay_stats['next_attempt'] - now):.0f}s"
+            )
+            if relay_stats["last_error"]:
+                lines.append(f"    last error: {relay_stats['last_error']}")
+        messagebox.showinfo("Outbox", "\n".join(lines))
+
     def enter_keys_and_relay(self):
         self.private_key.set(
             simpledialog.askstring("Input", "Enter your private key:", show="*")
         )
         self.public_key.set(simpledialog.askstring("Input", "Enter your public key:"))
         self.relay_url.set(simpledialog.askstring("Input", "Enter your relay URL:"))
+        self.relays_saved()
 
         # Save the values in the controller
         print("Private Key:", self.private_key.get())  # Debugging
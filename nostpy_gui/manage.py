@@ -1,8 +1,12 @@
 
 import tkinter as tk
-from tkinter import ttk
-import asyncio
-from nostpy_gui.event import Event
+from tkinter import filedialog, messagebox, ttk
+from logging import ERROR, INFO
+from nostpy_gui.archive import replay
+from nostpy_gui.bulk import BulkImportDialog
+from nostpy_gui.console import LogConsole
+from nostpy_gui.event import Event, split_relays
+from nostpy_gui.reconcile import PolicyError, load_policy, plan_reconcile
 
 class ManageRelayPage(ttk.Frame):
     def __init__(self, parent, controller):
@@ -70,27 +74,123 @@ class ManageRelayPage(ttk.Frame):
         )
         button4.pack(pady=5)
 
+        ttk.Button(
+            sidebar,
+            text="Bulk Import...",
+            command=lambda: BulkImportDialog(self, self.controller, self.output_text),
+        ).pack(pady=15)
+        ttk.Button(
+            sidebar, text="Reconcile Policy...", command=self.reconcile
+        ).pack(pady=5)
+        ttk.Button(
+            sidebar, text="Import NDJSON...", command=self.import_archive
+        ).pack(pady=5)
+
         main_content = ttk.Frame(self)
         main_content.pack(fill="both", expand=True, padx=10, pady=10)
 
-        self.output_text = tk.Text(main_content, height=20, bg="#2E2E2E", fg="#FFFFFF")
+        self.output_text = LogConsole(main_content, height=20)
         self.output_text.pack(pady=10, fill="both", expand=True)
 
     def send_note(self, verb, type, obj_to_mod):
-        relay_urls = [self.relay_url.get()]
+        relay_urls = split_relays(self.relay_url.get())
         content = self.content.get()
         kind = int(42021)
         tags = [[verb, type, obj_to_mod]]
 
-        event = Event(
-            relays=relay_urls,
-            controller=self.controller,
-            output_widget=self.output_text,
+        event = Event.from_controller(
+            relay_urls, self.controller, self.output_text
+        )
+        self.controller.run_async(
+            event.queue_event(content, kind, tags, self.controller.outbox)
+        )
+
+    def reconcile(self):
+        path = filedialog.askopenfilename(
+            parent=self, title="Policy file", filetypes=[("JSON", "*.json")]
         )
-        asyncio.run(event.send_event(content, kind, tags))
+        if not path:
+            return
+        try:
+            desired = load_policy(path)
+        except (OSError, PolicyError) as exc:
+            self.output_text.log(f"Can't load policy: {exc}", ERROR)
+            return
+        relay_urls = split_relays(self.relay_url.get())
+        event = Event.from_controller(
+            relay_urls, self.controller, self.output_text
+        )
+        self.output_text.log(
+            f"Comparing {len(desired)} policy entries with {len(relay_urls)} "
+            "relay(s)...",
+            INFO,
+        )
+        self.controller.run_async(
+            plan_reconcile(event, desired),
+            on_done=lambda future: self.confirm_reconcile(event, future),
+        )
+
+    def confirm_reconcile(self, event, future):
+        try:
+            plans = future.result()
+        except Exception as exc:
+            self.output_text.log(f"Reconcile failed: {exc}", ERROR)
+            return
+        lines = []
+        for relay, specs in plans.items():
+            if isinstance(specs, BaseException):
+                lines.append(f"{relay}: skipped, couldn't read its state ({specs})")
+            else:
+                lines.append(f"{relay}: {len(specs)} change(s)")
+        summary = "\n".join(lines)
+        self.output_text.log(summary, INFO)
+        skipped = any(isinstance(specs, BaseException) for specs in plans.values())
+        plans = {
+            relay: specs
+            for relay, specs in plans.items()
+            if not isinstance(specs, BaseException) and specs
+        }
+        if not plans:
+            if not skipped:
+                self.output_text.log("Relays already match the policy", INFO)
+            return
+        if messagebox.askyesno(
+            "Confirm reconcile", f"Send these changes?\n\n{summary}", parent=self
+        ):
+            self.controller.run_async(event.send_planned(plans))
+
+    def import_archive(self):
+        path = filedialog.askopenfilename(
+            parent=self,
+            title="Archive to replay",
+            filetypes=[("NDJSON", "*.ndjson"), ("All files", "*")],
+        )
+        if not path:
+            return
+        relay_urls = split_relays(self.relay_url.get())
+        event = Event.from_controller(
+            relay_urls, self.controller, self.output_text
+        )
+        self.output_text.log(f"Replaying {path} to {len(relay_urls)} relay(s)", INFO)
+        self.controller.run_async(
+            replay(event, path), on_done=self.import_finished
+        )
+
+    def import_finished(self, future):
+        try:
+            report = future.result()
+        except Exception as exc:
+            self.output_text.log(f"Import failed: {exc}", ERROR)
+            return
+        for relay, result in report.items():
+            self.output_text.log(
+                f"Import to {relay}: {result['accepted']} accepted, "
+                f"{result['rejected']} rejected, {result['failed']} failed",
+                INFO,
+            )
 
     def clear_output(self):
-        self.output_text.delete("1.0", tk.END)
+        self.output_text.clear()
 
     def change_text_color(self, color):
-        self.output_text.config(fg=color)
\ No newline at end of file
+        self.output_text.set_foreground(color)
\ No newline at end of file
@@ -0,0 +1,111 @@
+import csv
+import json
+import threading
+import time
+from collections import deque
+
+WINDOW = 1000  # samples kept per relay and metric
+RATE_WINDOW = 60  # seconds events/sec is averaged over
+
+LATENCY_METRICS = ("connect", "send_to_ok", "first_event", "eose")
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = int(round(pct / 100 * (len(sorted_values) - 1)))
+    return sorted_values[min(index, len(sorted_values) - 1)]
+
+
+class RelayMetrics:
+    def __init__(self, window):
+        self.latencies = {name: deque(maxlen=window) for name in LATENCY_METRICS}
+        self.events = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self._event_times = deque()
+
+    def events_per_s(self, now):
+        while self._event_times and now - self._event_times[0][0] > RATE_WINDOW:
+            self._event_times.popleft()
+        return sum(count for _, count in self._event_times) / RATE_WINDOW
+
+
+class MetricsRecorder:
+    # Rolling per-relay timings fed by Event and the connection pool from
+    # the worker loop, read by the metrics page from the Tk thread
+    def __init__(self, window=WINDOW):
+        self.window = window
+        self._relays = {}
+        self._lock = threading.Lock()
+
+    def _relay(self, relay):
+        metrics = self._relays.get(relay)
+        if metrics is None:
+            metrics = self._relays[relay] = RelayMetrics(self.window)
+        return metrics
+
+    def observe(self, relay, metric, seconds):
+        with self._lock:
+            self._relay(relay).latencies[metric].append(seconds)
+
+    def count(self, relay, events=0, bytes_in=0, bytes_out=0):
+        with self._lock:
+            metrics = self._relay(relay)
+            metrics.events += events
+            metrics.bytes_in += bytes_in
+            metrics.bytes_out += bytes_out
+            if events:
+                metrics._event_times.append((time.monotonic(), events))
+
+    def reset(self):
+        with self._lock:
+            self._relays = {}
+
+    def snapshot(self) -> dict:
+        now = time.monotonic()
+        snapshot = {}
+        with self._lock:
+            for relay, metrics in self._relays.items():
+                latency_ms = {}
+                for name, samples in metrics.latencies.items():
+                    ordered = sorted(samples)
+                    stats = latency_ms[name] = {"samples": len(ordered)}
+                    for pct in (50, 95, 99):
+                        value = percentile(ordered, pct)
+                        stats[f"p{pct}"] = (
+                            None if value is None else round(value * 1000, 2)
+                        )
+                snapshot[relay] = {
+                    "latency_ms": latency_ms,
+                    "events": metrics.events,
+                    "events_per_s": round(metrics.events_per_s(now), 2),
+                    "bytes_in": metrics.bytes_in,
+                    "bytes_out": metrics.bytes_out,
+                }
+        return snapshot
+
+    def export_json(self, path):
+        with open(path, "w", encoding="utf-8") as handle:
+            json.dump(
+                {"generated_at": int(time.time()), "relays": self.snapshot()},
+                handle,
+                indent=2,
+            )
+
+    def export_csv(self, path):
+        fields = ("relay", "metric", "samples", "p50", "p95", "p99")
+        counters = ("events", "events_per_s", "bytes_in", "bytes_out")
+        with open(path, "w", newline="", encoding="utf-8") as handle:
+            writer = csv.writer(handle)
+            writer.writerow(fields + counters)
+            for relay, stats in self.snapshot().items():
+                for metric, latency in stats["latency_ms"].items():
+                    writer.writerow(
+                        [relay, metric]
+                        + [latency[field] for field in fields[2:]]
+                        + [stats[counter] for counter in counters]
+                    )
+
+
+recorder = MetricsRecorder()
@@ -0,0 +1,119 @@
+import tkinter as tk
+from tkinter import ttk, filedialog
+from nostpy_gui.metrics import recorder
+
+REFRESH_MS = 1000
+
+
+class MetricsPage(ttk.Frame):
+    def __init__(self, parent, controller):
+        super().__init__(parent)
+        self.controller = controller
+        self.status = tk.StringVar()
+
+        title_frame = ttk.Frame(self)
+        title_frame.pack(fill="x", pady=10)
+        ttk.Label(title_frame, text="Relay Metrics Page").pack()
+        ttk.Button(
+            title_frame,
+            text="Back to Home",
+            command=lambda: controller.show_frame("LandingPage"),
+        ).pack()
+
+        buttons = ttk.Frame(self)
+        buttons.pack(pady=5)
+        ttk.Button(buttons, text="Export JSON", command=self.export_json).pack(
+            side="left", padx=5
+        )
+        ttk.Button(buttons, text="Export CSV", command=self.export_csv).pack(
+            side="left", padx=5
+        )
+        ttk.Button(buttons, text="Reset", command=self.reset).pack(
+            side="left", padx=5
+        )
+        ttk.Label(self, textvariable=self.status).pack()
+
+        ttk.Label(self, text="Latency (ms)").pack(pady=(10, 0))
+        self.latency_view = ttk.Treeview(
+            self,
+            columns=("relay", "metric", "samples", "p50", "p95", "p99"),
+            show="headings",
+            height=10,
+        )
+        for column in ("relay", "metric", "samples", "p50", "p95", "p99"):
+            self.latency_view.heading(column, text=column)
+        self.latency_view.column("relay", width=260)
+        self.latency_view.pack(fill="both", expand=True, padx=10)
+
+        ttk.Label(self, text="Throughput").pack(pady=(10, 0))
+        self.counter_view = ttk.Treeview(
+            self,
+            columns=("relay", "events", "events_per_s", "bytes_in", "bytes_out"),
+            show="headings",
+            height=4,
+        )
+        for column in ("relay", "events", "events_per_s", "bytes_in", "bytes_out"):
+            self.counter_view.heading(column, text=column)
+        self.counter_view.column("relay", width=260)
+        self.counter_view.pack(fill="x", padx=10, pady=(0, 10))
+
+        self._refresh_job = None
+
+    def on_show(self):
+        self.refresh()
+
+    def refresh(self):
+        snapshot = recorder.snapshot()
+        self.latency_view.delete(*self.latency_view.get_children())
+        self.counter_view.delete(*self.counter_view.get_children())
+        for relay, stats in snapshot.items():
+            for metric, latency in stats["latency_ms"].items():
+                self.latency_view.insert(
+                    "",
+                    "end",
+                    values=(
+                        relay,
+                        metric,
+                        latency["samples"],
+                        latency["p50"] if latency["p50"] is not None else "",
+                        latency["p95"] if latency["p95"] is not None else "",
+                        latency["p99"] if latency["p99"] is not None else "",
+                    ),
+                )
+            self.counter_view.insert(
+                "",
+                "end",
+                values=(
+                    relay,
+                    stats["events"],
+                    stats["events_per_s"],
+                    stats["bytes_in"],
+                    stats["bytes_out"],
+                ),
+            )
+        # Keep refreshing only while the page is on top
+        if self._refresh_job:
+            self.after_cancel(self._refresh_job)
+            self._refresh_job = None
+        if self.controller.current_frame == "MetricsPage":
+            self._refresh_job = self.after(REFRESH_MS, self.refresh)
+
+    def export_json(self):
+        path = filedialog.asksaveasfilename(
+            defaultextension=".json", filetypes=[("JSON", "*.json")]
+        )
+        if path:
+            recorder.export_json(path)
+            self.status.set(f"Exported to {path}")
+
+    def export_csv(self):
+        path = filedialog.asksaveasfilename(
+            defaultextension=".csv", filetypes=[("CSV", "*.csv")]
+        )
+        if path:
+            recorder.export_csv(path)
+            self.status.set(f"Exported to {path}")
+
+    def reset(self):
+        recorder.reset()
+        self.refresh()
@@ -0,0 +1,204 @@
+import asyncio
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from logging import INFO, WARNING
+from nostpy_gui import protocol
+from nostpy_gui.event import BULK_WINDOW
+
+DEFAULT_DB_PATH = os.path.join(os.path.expanduser("~"), ".nostpy_gui", "outbox.db")
+FLUSH_BATCH = 500
+RETRY_BASE = 2  # seconds before the first retry, doubled on every failure
+RETRY_MAX = 300
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    event_id TEXT NOT NULL,
+    relay TEXT NOT NULL,
+    event TEXT NOT NULL,
+    queued_at REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt REAL NOT NULL,
+    last_error TEXT,
+    PRIMARY KEY (event_id, relay)
+);
+CREATE INDEX IF NOT EXISTS outbox_next_attempt ON outbox (next_attempt);
+"""
+
+
+def retry_delay(attempts) -> float:
+    # Exponential backoff with jitter, so relays coming back up aren't hit
+    # by every queued client in the same second
+    delay = min(RETRY_BASE * 2 ** min(attempts, 16), RETRY_MAX)
+    return delay * random.uniform(0.8, 1.2)
+
+
+def is_rate_limited(ok) -> bool:
+    # NIP-01 machine readable prefix; the relay wants the event, just later
+    return not ok.accepted and (ok.message or "").startswith("rate-limited:")
+
+
+class Outbox:
+    # Signed events waiting for an OK, one row per event and relay, kept on
+    # disk so a relay being down (or the app being closed) loses nothing.
+    # run() is the flusher, a task on the worker loop that drains due rows
+    # and is woken by enqueue() from any thread
+    def __init__(self, path=DEFAULT_DB_PATH):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.executescript(SCHEMA)
+        self._loop = None
+        self._wake = None
+
+    def enqueue(self, event_data, relays) -> int:
+        # An event already queued for a relay is not queued twice
+        now = time.time()
+        event_json = json.dumps(event_data)
+        rows = [(event_data["id"], relay, event_json, now, now) for relay in relays]
+        with self._lock, self._conn:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO outbox "
+                "(event_id, relay, event, queued_at, next_attempt) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            added = self._conn.total_changes - before
+        if added and self._wake is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+        return added
+
+    def due(self, now, limit=FLUSH_BATCH) -> list:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT event_id, relay, event, attempts FROM outbox "
+                "WHERE next_attempt <= ? ORDER BY next_attempt LIMIT ?",
+                (now, limit),
+            ).fetchall()
+
+    def next_attempt(self):
+        with self._lock:
+            row = self._conn.execute("SELECT MIN(next_attempt) FROM outbox").fetchone()
+        return row[0]
+
+    def settle(self, relay, done, failed):
+        # done: event ids the relay answered (accepted or rejected, either
+        # way there is nothing left to retry); failed: (event_id, attempts,
+        # error) to try again later, rate limited ones included
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "DELETE FROM outbox WHERE event_id = ? AND relay = ?",
+                [(event_id, relay) for event_id in done],
+            )
+            self._conn.executemany(
+                "UPDATE outbox SET attempts = ?, next_attempt = ?, last_error = ? "
+                "WHERE event_id = ? AND relay = ?",
+                [
+                    (attempts + 1, now + retry_delay(attempts), error, event_id, relay)
+                    for event_id, attempts, error in failed
+                ],
+            )
+
+    def stats(self) -> dict:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT relay, COUNT(*), MIN(queued_at), MAX(attempts), "
+                "MIN(next_attempt) FROM outbox GROUP BY relay"
+            ).fetchall()
+            errors = dict(
+                self._conn.execute(
+                    "SELECT relay, last_error FROM outbox "
+                    "WHERE last_error IS NOT NULL GROUP BY relay"
+                ).fetchall()
+            )
+        return {
+            relay: {
+                "pending": pending,
+                "oldest_queued_at": oldest,
+                "max_attempts": attempts,
+                "next_attempt": next_attempt,
+                "last_error": errors.get(relay),
+            }
+            for relay, pending, oldest, attempts, next_attempt in rows
+        }
+
+    async def run(self, event, window=BULK_WINDOW, ok_timeout=10):
+        # event is only used to deliver and log, its own relays don't matter
+        self._loop = asyncio.get_event_loop()
+        self._wake = asyncio.Event()
+        try:
+            while True:
+                self._wake.clear()
+                due = self.due(time.time())
+                if due:
+                    await self._flush(event, due, window, ok_timeout)
+                    continue
+                next_attempt = self.next_attempt()
+                timeout = None
+                if next_attempt is not None:
+                    timeout = max(0, next_attempt - time.time())
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self._wake = None
+
+    async def _flush(self, event, due, window, ok_timeout):
+        by_relay = {}
+        for event_id, relay, event_json, attempts in due:
+            by_relay.setdefault(relay, []).append(
+                (event_id, json.loads(event_json), attempts)
+            )
+        await asyncio.gather(
+            *(
+                self._flush_relay(event, relay, rows, window, ok_timeout)
+                for relay, rows in by_relay.items()
+            )
+        )
+
+    async def _flush_relay(self, event, relay, rows, window, ok_timeout):
+        outcomes = {}
+        error = None
+        try:
+            await event.deliver(
+                relay,
+                [event_data for _, event_data, _ in rows],
+                on_result=outcomes.__setitem__,
+                window=window,
+                ok_timeout=ok_timeout,
+            )
+        except Exception as exc:
+            error = str(exc) or type(exc).__name__
+
+        done = []
+        failed = []
+        for event_id, _, attempts in rows:
+            outcome = outcomes.get(event_id)
+            if isinstance(outcome, protocol.OkMessage) and not is_rate_limited(outcome):
+                done.append(event_id)
+            elif isinstance(outcome, protocol.OkMessage):
+                failed.append((event_id, attempts, outcome.message))
+            else:
+                reason = error or str(outcome or "") or "no OK received"
+                failed.append((event_id, attempts, reason))
+        self.settle(relay, done, failed)
+        if done:
+            event.log(f"Outbox delivered {len(done)} event(s) to {relay}", INFO)
+        if failed:
+            event.log(
+                f"Outbox couldn't deliver {len(failed)} event(s) to {relay} "
+                f"({failed[0][2]}), will retry",
+                WARNING,
+            )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
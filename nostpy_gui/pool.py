@@ -0,0 +1,147 @@
+import asyncio
+import time
+import weakref
+
+from nostpy_gui.health import registry
+from nostpy_gui.metrics import recorder
+
+IDLE_TIMEOUT = 60
+KEEPALIVE_INTERVAL = 20
+CONNECT_TIMEOUT = 10
+
+
+def is_open(ws) -> bool:
+    state = getattr(ws, "state", None)
+    return getattr(state, "name", "") == "OPEN"
+
+
+class ConnectionPool:
+    def __init__(
+        self, idle_timeout=IDLE_TIMEOUT, keepalive_interval=KEEPALIVE_INTERVAL
+    ):
+        self.idle_timeout = idle_timeout
+        self.keepalive_interval = keepalive_interval
+        self._idle = {}  # relay url -> [(ws, last_used), ...]
+        self._janitor = None
+        self.handshakes = 0
+        self.reuse_hits = 0
+        self.reconnects = 0
+        self.evictions = 0
+
+    async def connect(self, url):
+        # websockets is imported on first connect so it stays off the
+        # startup path
+        import websockets
+
+        # A relay the health registry has marked down fails straight away
+        # instead of costing a connect timeout
+        registry.check(url)
+        # websockets sends keepalive pings on its own every ping_interval,
+        # idle sockets included
+        started = time.perf_counter()
+        try:
+            ws = await asyncio.wait_for(
+                websockets.connect(url, ping_interval=self.keepalive_interval),
+                CONNECT_TIMEOUT,
+            )
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            registry.record_failure(url, exc)
+            raise
+        elapsed = time.perf_counter() - started
+        registry.record_success(url, elapsed)
+        recorder.observe(url, "connect", elapsed)
+        self.handshakes += 1
+        self._ensure_janitor()
+        return ws
+
+    async def acquire(self, url):
+        idle = self._idle.get(url)
+        while idle:
+            ws, _ = idle.pop()
+            if is_open(ws):
+                self.reuse_hits += 1
+                return ws, True
+            # Dropped while idle, fall through to a fresh handshake
+            self.reconnects += 1
+        return await self.connect(url), False
+
+    async def release(self, url, ws, discard=False):
+        if discard or not is_open(ws):
+            await ws.close()
+            return
+        self._idle.setdefault(url, []).append((ws, time.monotonic()))
+
+    async def run(self, url, func):
+        # Lease a socket for func(ws); a reused socket that turns out to be
+        # dead is replaced once without the caller noticing
+        import websockets
+
+        for attempt in range(2):
+            ws, reused = await self.acquire(url)
+            try:
+                result = await func(ws)
+            except websockets.ConnectionClosed:
+                await self.release(url, ws, discard=True)
+                if reused and attempt == 0:
+                    self.reconnects += 1
+                    continue
+                raise
+            except BaseException:
+                # A timed out or cancelled exchange may leave replies in
+                # flight, so the socket is not handed to anyone else
+                await self.release(url, ws, discard=True)
+                raise
+            await self.release(url, ws)
+            return result
+
+    def _ensure_janitor(self):
+        if self._janitor is None or self._janitor.done():
+            self._janitor = asyncio.ensure_future(self._evict_idle())
+
+    async def _evict_idle(self):
+        while True:
+            await asyncio.sleep(self.keepalive_interval)
+            now = time.monotonic()
+            evicted = []
+            for url, idle in self._idle.items():
+                keep = []
+                for ws, last_used in idle:
+                    if is_open(ws) and now - last_used < self.idle_timeout:
+                        keep.append((ws, last_used))
+                    else:
+                        evicted.append(ws)
+                idle[:] = keep
+            self.evictions += len(evicted)
+            for ws in evicted:
+                await ws.close()
+
+    async def close_all(self):
+        if self._janitor:
+            self._janitor.cancel()
+        idle, self._idle = self._idle, {}
+        for conns in idle.values():
+            for ws, _ in conns:
+                await ws.close()
+
+    def stats(self) -> dict:
+        return {
+            "handshakes": self.handshakes,
+            "reuse_hits": self.reuse_hits,
+            "reconnects": self.reconnects,
+            "evictions": self.evictions,
+            "idle": sum(len(conns) for conns in self._idle.values()),
+        }
+
+
+_pools = weakref.WeakKeyDictionary()
+
+
+def get_pool() -> ConnectionPool:
+    # One pool per event loop, sockets can't be shared across loops
+    loop = asyncio.get_event_loop()
+    pool = _pools.get(loop)
+    if pool is None:
+        pool = _pools[loop] = ConnectionPool()
+    return pool
@@ -0,0 +1,236 @@
+import os
+import sys
+import threading
+import time
+
+ENV_VAR = "NOSTPY_PROFILE"
+DEFAULT_DIR = os.path.join(os.path.expanduser("~"), ".nostpy_gui", "profiles")
+SAMPLE_INTERVAL = 0.01  # seconds between stack samples
+STALL_MS = 100  # Tk loop lateness reported as a stall
+TRACE_FRAMES = 10
+TOP_ALLOCATIONS = 30
+
+
+def enabled_by_env() -> bool:
+    return os.environ.get(ENV_VAR, "") not in ("", "0")
+
+
+def callback_name(func) -> str:
+    func = getattr(func, "__func__", func)
+    name = getattr(func, "__qualname__", None) or repr(func)
+    module = getattr(func, "__module__", None)
+    return f"{module}.{name}" if module else name
+
+
+def frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+class Profiler:
+    # Opt-in, see NOSTPY_PROFILE or Manage > Profiling. While active:
+    # cProfile runs in the Tk and worker threads, a sampler thread collects
+    # stacks for flamegraphs, tracemalloc tracks allocations, and every Tk
+    # callback and run_async coroutine gets its wall time recorded. stop()
+    # writes it all to out_dir and returns the paths
+    def __init__(self, out_dir=DEFAULT_DIR, stall_ms=STALL_MS):
+        self.out_dir = out_dir
+        self.stall_ms = stall_ms
+        self.active = False
+        self.stalls = []
+        self._calls = {}
+        self._profiles = {}
+        self._stacks = {}
+        self._slowest = (0.0, None)
+        self._lock = threading.Lock()
+        self._sampler = None
+
+    def start(self):
+        # From the Tk thread; the worker loop enables its own profile with
+        # enable_loop()
+        import tracemalloc
+
+        if self.active:
+            return
+        self.stalls = []
+        self._calls = {}
+        self._profiles = {}
+        self._stacks = {}
+        tracemalloc.start(TRACE_FRAMES)
+        self.active = True
+        self.enable_thread("tk")
+        self._sampler = threading.Thread(
+            target=self._sample, name="nostpy-profiler", daemon=True
+        )
+        self._sampler.start()
+
+    def enable_thread(self, label=None):
+        import cProfile
+
+        label = label or threading.current_thread().name
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Python 3.12+ allows one active cProfile per process, the first
+            # one then covers every thread
+            return
+        with self._lock:
+            self._profiles[label] = profile
+
+    def disable_thread(self, label=None):
+        label = label or threading.current_thread().name
+        with self._lock:
+            profile = self._profiles.get(label)
+        if profile is not None:
+            profile.disable()
+
+    async def enable_loop(self):
+        self.enable_thread()
+
+    async def disable_loop(self):
+        self.disable_thread()
+
+    def record(self, name, elapsed, on_tk=True):
+        # on_tk: ran on the Tk thread, so a candidate for the stall it caused
+        with self._lock:
+            stats = self._calls.get(name)
+            if stats is None:
+                stats = self._calls[name] = [0, 0.0, 0.0]
+            stats[0] += 1
+            stats[1] += elapsed
+            stats[2] = max(stats[2], elapsed)
+            if on_tk and elapsed > self._slowest[0]:
+                self._slowest = (elapsed, name)
+
+    def call(self, func, *args):
+        if not self.active:
+            return func(*args)
+        started = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            self.record(callback_name(func), time.perf_counter() - started)
+
+    def wrap_coro(self, coro):
+        # Wall time from start to finish, socket waits included; the CPU
+        # side is in the worker's cProfile stats
+        name = "coro " + getattr(coro, "__qualname__", repr(coro))
+
+        async def timed():
+            started = time.perf_counter()
+            try:
+                return await coro
+            finally:
+                self.record(name, time.perf_counter() - started, on_tk=False)
+
+        return timed()
+
+    def heartbeat(self, lateness):
+        # Called from a Tk after() timer; lateness is how long past its due
+        # time it ran, i.e. how long the Tk loop was blocked
+        with self._lock:
+            slowest, name = self._slowest
+            self._slowest = (0.0, None)
+        if lateness * 1000 < self.stall_ms:
+            return
+        if name is None or slowest < lateness / 2:
+            name = "outside Python callbacks (redraw, layout)"
+        self.stalls.append((time.time(), round(lateness * 1000, 1), name))
+
+    def _sample(self):
+        own_id = threading.get_ident()
+        while self.active:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(frame_label(frame))
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                key = ";".join(reversed(stack))
+                self._stacks[key] = self._stacks.get(key, 0) + 1
+            time.sleep(SAMPLE_INTERVAL)
+
+    def stop(self) -> list:
+        # Call disable_loop() on the worker first so its stats are complete
+        import tracemalloc
+
+        if not self.active:
+            return []
+        self.active = False
+        self.disable_thread("tk")
+        self._sampler.join()
+        snapshot = tracemalloc.take_snapshot()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        os.makedirs(self.out_dir, exist_ok=True)
+        prefix = os.path.join(
+            self.out_dir, time.strftime("%Y%m%d-%H%M%S", time.localtime())
+        )
+        paths = []
+        for label, profile in self._profiles.items():
+            path = f"{prefix}-{label}.pstats"
+            profile.dump_stats(path)
+            paths.append(path)
+
+        path = f"{prefix}.collapsed"
+        with open(path, "w", encoding="utf-8") as handle:
+            for stack, count in sorted(self._stacks.items()):
+                handle.write(f"{stack} {count}\n")
+        paths.append(path)
+
+        path = f"{prefix}-memory.txt"
+        with open(path, "w", encoding="utf-8") as handle:
+            handle.write(f"peak traced: {peak / 1024:.0f} KiB\n")
+            for stat in snapshot.statistics("lineno")[:TOP_ALLOCATIONS]:
+                handle.write(f"{stat}\n")
+        paths.append(path)
+
+        path = f"{prefix}-callbacks.txt"
+        with open(path, "w", encoding="utf-8") as handle:
+            handle.write(f"{'callback':<70} {'calls':>7} {'total_ms':>10} ")
+            handle.write(f"{'max_ms':>9}\n")
+            calls = sorted(self._calls.items(), key=lambda item: -item[1][1])
+            for name, (count, total, longest) in calls:
+                handle.write(
+                    f"{name[-70:]:<70} {count:>7} {total * 1000:>10.1f} "
+                    f"{longest * 1000:>9.1f}\n"
+                )
+            handle.write(f"\nTk loop stalls over {self.stall_ms}ms:\n")
+            for at, stall_ms, name in self.stalls:
+                stamp = time.strftime("%H:%M:%S", time.localtime(at))
+                handle.write(f"{stamp} {stall_ms:>8.1f}ms  {name}\n")
+        paths.append(path)
+        return paths
+
+
+def install_tk_hook(profiler):
+    # Every Tk callback (button commands, after() timers, traces, bindings)
+    # goes through tkinter.CallWrapper, so timing it there covers all pages
+    # without touching their handlers. Widgets bind their callbacks when
+    # created, hence installed up front and a no-op while profiling is off
+    import tkinter
+
+    base = tkinter.CallWrapper
+    if getattr(base, "profiler", None) is not None:
+        return
+
+    class ProfiledCallWrapper(base):
+        def __call__(self, *args):
+            if not profiler.active:
+                return base.__call__(self, *args)
+            started = time.perf_counter()
+            try:
+                return base.__call__(self, *args)
+            finally:
+                profiler.record(callback_name(self.func), time.perf_counter() - started)
+
+    ProfiledCallWrapper.profiler = profiler
+    tkinter.CallWrapper = ProfiledCallWrapper
+
+
+profiler = Profiler()
@@ -0,0 +1,101 @@
+import json
+from collections import namedtuple
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+EventMessage = namedtuple("EventMessage", "sub_id event")
+EoseMessage = namedtuple("EoseMessage", "sub_id")
+OkMessage = namedtuple("OkMessage", "event_id accepted message")
+NoticeMessage = namedtuple("NoticeMessage", "message")
+ClosedMessage = namedtuple("ClosedMessage", "sub_id message")
+CountMessage = namedtuple("CountMessage", "sub_id count approximate")
+
+
+class ProtocolError(ValueError):
+    pass
+
+
+if orjson is not None:
+
+    def loads(raw):
+        return orjson.loads(raw)
+
+    def dumps(obj) -> str:
+        return orjson.dumps(obj).decode("utf-8")
+
+    _DECODE_ERRORS = (orjson.JSONDecodeError, TypeError)
+else:
+
+    def loads(raw):
+        return json.loads(raw)
+
+    def dumps(obj) -> str:
+        return json.dumps(obj, separators=(",", ":"), ensure_ascii=False)
+
+    _DECODE_ERRORS = (json.JSONDecodeError, TypeError)
+
+
+def _decode_event(frame):
+    if len(frame) < 3 or not isinstance(frame[2], dict):
+        raise ProtocolError("EVENT frame without an event object")
+    return EventMessage(frame[1], frame[2])
+
+
+def _decode_eose(frame):
+    return EoseMessage(frame[1])
+
+
+def _decode_ok(frame):
+    if len(frame) < 3:
+        raise ProtocolError("OK frame without an accepted flag")
+    return OkMessage(frame[1], bool(frame[2]), frame[3] if len(frame) > 3 else "")
+
+
+def _decode_notice(frame):
+    return NoticeMessage(frame[1])
+
+
+def _decode_closed(frame):
+    return ClosedMessage(frame[1], frame[2] if len(frame) > 2 else "")
+
+
+def _decode_count(frame):
+    # NIP-45
+    if len(frame) < 3 or not isinstance(frame[2], dict):
+        raise ProtocolError("COUNT frame without a count object")
+    try:
+        count = int(frame[2]["count"])
+    except (KeyError, TypeError, ValueError) as exc:
+        raise ProtocolError(f"COUNT frame with a bad count: {exc}") from exc
+    return CountMessage(frame[1], count, bool(frame[2].get("approximate")))
+
+
+_DECODERS = {
+    "EVENT": _decode_event,
+    "EOSE": _decode_eose,
+    "OK": _decode_ok,
+    "NOTICE": _decode_notice,
+    "CLOSED": _decode_closed,
+    "COUNT": _decode_count,
+}
+
+
+def decode(raw):
+    # Relay -> client frames from NIP-01, decoded exactly once
+    try:
+        frame = loads(raw)
+    except _DECODE_ERRORS as exc:
+        raise ProtocolError(f"Invalid JSON frame: {exc}") from exc
+    if not isinstance(frame, list) or len(frame) < 2:
+        raise ProtocolError(f"Not a relay message: {raw!r:.80}")
+    decoder = _DECODERS.get(frame[0])
+    if decoder is None:
+        raise ProtocolError(f"Unknown message type: {frame[0]!r}")
+    return decoder(frame)
+
+
+def encode(*parts) -> str:
+    return dumps(list(parts))
@@ -1,8 +1,25 @@
 
-import tkinter as tk
-from tkinter import ttk
 import asyncio
-from nostpy_gui.event import Event
+import tkinter as tk
+from logging import ERROR, INFO, WARNING
+from tkinter import filedialog, ttk
+from nostpy_gui.archive import export_query
+from nostpy_gui.console import LogConsole
+from nostpy_gui.event import Event, merge_records, split_relays
+from nostpy_gui.filters import (
+    FilterError,
+    build_filter,
+    parse_tags,
+    parse_time,
+    query_cache,
+    split_values,
+)
+from nostpy_gui.records import MODERATION_KIND, AllowlistRecord
+from nostpy_gui.store import AllowlistStore
+from nostpy_gui.tableview import VirtualTable
+from nostpy_gui.verify import INVALID, NOT_ADMIN, UNSIGNED, Verifier
+
+SEARCH_DEBOUNCE_MS = 300
 
 class QueryRelayPage(ttk.Frame):
     def __init__(self, parent, controller):
@@ -11,6 +28,19 @@ class QueryRelayPage(ttk.Frame):
 
         self.relay_url = controller.relay_url
         self.public_key = controller.public_key
+        self.search_prefix = tk.StringVar()
+        self._store = None
+        self._load_id = 0
+        self._search_after = None
+        self.live = tk.BooleanVar(value=False)
+        self._live_future = None
+        self.verify = tk.BooleanVar(value=False)
+        self.admin_keys = tk.StringVar()
+        self.verifier = Verifier()
+        self.filter_fields = {
+            name: tk.StringVar()
+            for name in ("authors", "#p", "tags", "since", "until", "limit")
+        }
 
         ttk.Label(self, text="Query Relay Page").pack(pady=20)
         ttk.Button(
@@ -22,12 +52,69 @@ class QueryRelayPage(ttk.Frame):
         content_frame = ttk.Frame(self)
         content_frame.pack(fill="both", expand=True)
 
+        # Narrows the query on the relay side; left empty, the whole
+        # allowlist is synced into the local mirror as before
+        filter_frame = ttk.Frame(content_frame)
+        filter_frame.pack(pady=(10, 0))
+        labels = {
+            "authors": "Authors",
+            "#p": "#p pubkeys",
+            "tags": "Tags (e.g. t:spam)",
+            "since": "Since",
+            "until": "Until",
+            "limit": "Limit",
+        }
+        # A row each for the long hex lists, since/until/limit share one
+        for row, name in enumerate(("authors", "#p", "tags")):
+            ttk.Label(filter_frame, text=labels[name]).grid(
+                row=row, column=0, sticky="w", padx=5
+            )
+            ttk.Entry(
+                filter_frame, textvariable=self.filter_fields[name], width=64
+            ).grid(row=row, column=1, columnspan=5, sticky="ew", padx=5)
+        for index, name in enumerate(("since", "until", "limit")):
+            ttk.Label(filter_frame, text=labels[name]).grid(
+                row=3, column=index * 2, sticky="w", padx=5
+            )
+            ttk.Entry(
+                filter_frame, textvariable=self.filter_fields[name], width=16
+            ).grid(row=3, column=index * 2 + 1, sticky="w", padx=5)
+
         button1 = ttk.Button(
             content_frame, text="Show Allow List", command=self.query_allow_list
         )
         button1.pack(pady=10)
+        ttk.Button(
+            content_frame, text="Export NDJSON...", command=self.export_allow_list
+        ).pack()
+        ttk.Checkbutton(
+            content_frame,
+            text="Live (follow new moderation events)",
+            variable=self.live,
+            command=self.toggle_live,
+        ).pack()
+
+        verify_frame = ttk.Frame(content_frame)
+        verify_frame.pack()
+        ttk.Checkbutton(
+            verify_frame,
+            text="Verify signatures, admin pubkeys:",
+            variable=self.verify,
+            command=self.toggle_verify,
+        ).pack(side="left")
+        ttk.Entry(verify_frame, textvariable=self.admin_keys, width=40).pack(
+            side="left", padx=5
+        )
+
+        search_frame = ttk.Frame(content_frame)
+        search_frame.pack()
+        ttk.Label(search_frame, text="Search pubkey prefix").pack(side="left")
+        ttk.Entry(search_frame, textvariable=self.search_prefix, width=40).pack(
+            side="left", padx=5
+        )
+        self.search_prefix.trace_add("write", lambda *args: self.search_changed())
 
-        self.output_text = tk.Text(content_frame, height=10, bg="#2E2E2E", fg="#FFFFFF")
+        self.output_text = LogConsole(content_frame, height=10)
         self.output_text.pack(pady=10, fill="x", expand=True)
 
         style = ttk.Style()
@@ -46,33 +133,231 @@ class QueryRelayPage(ttk.Frame):
         )
         style.map("Treeview.Heading", background=[("active", "#666666")])
 
-        self.treeview = ttk.Treeview(
+        self.record_count = tk.StringVar(value="0 records")
+        ttk.Label(self, textvariable=self.record_count).pack()
+
+        # Rows are the merger's compact records, turned into hex only for
+        # the handful of rows on screen
+        self.table = VirtualTable(
             self,
-            columns=("pubkey", "kind", "allowed", "mgmt_note_id"),
-            show="headings",
+            columns=("pubkey", "kind", "allowed", "mgmt_note_id", "signature"),
+            render=self.render_row,
+            row_tags=self.row_tags,
+        )
+        self.table.treeview.tag_configure("invalid", foreground="#FF5555")
+        self.table.pack(pady=10, fill="both", expand=True)
+
+    def signature_status(self, record):
+        if not self.verify.get():
+            return ""
+        return self.verifier.status(record) or "checking"
+
+    def render_row(self, record):
+        return AllowlistRecord.row(record) + (self.signature_status(record),)
+
+    def row_tags(self, record):
+        if self.signature_status(record) in (INVALID, NOT_ADMIN):
+            return ("invalid",)
+        return ()
+
+    @property
+    def store(self):
+        if self._store is None:
+            self._store = AllowlistStore()
+        return self._store
+
+    def on_show(self):
+        self.load_cached()
+
+    def search_changed(self):
+        # Reload once typing pauses, not per keystroke
+        if self._search_after is not None:
+            self.after_cancel(self._search_after)
+        self._search_after = self.after(SEARCH_DEBOUNCE_MS, self.load_cached)
+
+    def load_cached(self, then=None):
+        # Show what the local mirror already has, filtered by the search
+        # box. Reading and packing a large mirror takes seconds, so that
+        # runs off the Tk thread; only the latest load fills the table,
+        # then then() is called
+        self._search_after = None
+        relay_urls = split_relays(self.relay_url.get())
+        prefix = self.search_prefix.get().strip()
+        store = self.store
+        self._load_id += 1
+        load_id = self._load_id
+
+        def read():
+            if prefix:
+                records = store.search(relay_urls, prefix)
+            else:
+                records = store.load(relay_urls)
+            return merge_records([records])
+
+        async def load():
+            return await asyncio.get_event_loop().run_in_executor(None, read)
+
+        def loaded(future):
+            if load_id != self._load_id:
+                return
+            if future.exception():
+                self.output_text.log(
+                    f"Couldn't read the local mirror: {future.exception()}", ERROR
+                )
+                return
+            self.table.clear()
+            self.show_records(future.result())
+            if then:
+                then()
+
+        self.controller.run_async(load(), on_done=loaded)
+
+    def build_query(self):
+        # The filter builder's query, None when every field is empty
+        fields = {name: var.get().strip() for name, var in self.filter_fields.items()}
+        if not any(fields.values()):
+            return None
+        tags = parse_tags(fields["tags"])
+        if fields["#p"]:
+            tags.setdefault("p", []).extend(split_values(fields["#p"]))
+        limit = fields["limit"]
+        if limit and not limit.isdigit():
+            raise FilterError(f"limit {limit!r} is not a number")
+        return build_filter(
+            authors=split_values(fields["authors"]),
+            tags=tags,
+            since=parse_time(fields["since"]),
+            until=parse_time(fields["until"]),
+            limit=int(limit) if limit else None,
         )
-        self.treeview.heading("pubkey", text="pubkey")
-        self.treeview.heading("kind", text="kind")
-        self.treeview.heading("allowed", text="allowed")
-        self.treeview.heading("mgmt_note_id", text="mgmt_note_id")
-        self.treeview.pack(pady=10, fill="both", expand=True)
 
     def query_allow_list(self):
-        relay_urls = [self.relay_url.get()]
-        query_dict = {"kinds": [42021]}
-
-        event = Event(
-            relays=relay_urls,
-            output_widget=self.output_text,
-            treeview=self.treeview,
-            controller=self.controller,
+        relay_urls = split_relays(self.relay_url.get())
+        try:
+            query_dict = self.build_query()
+        except FilterError as exc:
+            self.output_text.log(f"Invalid filter: {exc}", ERROR)
+            return
+        event = Event.from_controller(
+            relay_urls, self.controller, self.output_text
+        )
+
+        if query_dict is None:
+            # Cached records appear first, the sync only brings the deltas;
+            # started after the load so its batches aren't cleared away
+            self.load_cached(
+                then=lambda: self.controller.run_async(
+                    event.query_relays(
+                        {"kinds": [MODERATION_KIND]},
+                        on_batch=self.add_records,
+                        store=self.store,
+                    )
+                )
+            )
+            return
+
+        # Filtered lookups skip the local mirror, which only tracks the whole
+        # allowlist, and are answered from the query cache when they can be.
+        # A mirror load still in flight mustn't replace their results
+        self._load_id += 1
+        self.table.clear()
+        self.record_count.set("0 records")
+        self.controller.run_async(
+            event.query_relays(query_dict, on_batch=self.add_records, cache=query_cache)
+        )
+
+    def export_allow_list(self):
+        path = filedialog.asksaveasfilename(
+            parent=self,
+            defaultextension=".ndjson",
+            filetypes=[("NDJSON", "*.ndjson"), ("All files", "*")],
+        )
+        if not path:
+            return
+        try:
+            query_dict = self.build_query() or {"kinds": [MODERATION_KIND]}
+        except FilterError as exc:
+            self.output_text.log(f"Invalid filter: {exc}", ERROR)
+            return
+        relay_urls = split_relays(self.relay_url.get())
+        event = Event.from_controller(
+            relay_urls, self.controller, self.output_text
+        )
+        self.controller.run_async(export_query(event, query_dict, path))
+
+    def toggle_live(self):
+        if not self.live.get():
+            if self._live_future is not None:
+                self._live_future.cancel()
+                self._live_future = None
+            return
+        relay_urls = split_relays(self.relay_url.get())
+        event = Event.from_controller(
+            relay_urls, self.controller, self.output_text
+        )
+        self._live_future = self.controller.run_async(
+            event.live_tail(
+                {"kinds": [MODERATION_KIND]},
+                on_batch=self.add_records,
+                store=self.store,
+            ),
+            on_done=self._live_ended,
+        )
+
+    def _live_ended(self, future):
+        # The relays ended the tail themselves, rather than the toggle
+        if future is self._live_future:
+            self._live_future = None
+            self.live.set(False)
+
+    def add_records(self, records):
+        prefix = self.search_prefix.get().strip()
+        records = [
+            record
+            for record in records
+            if not prefix or (record.get("client_pub") or "").startswith(prefix)
+        ]
+        self.show_records(records)
+
+    def show_records(self, records):
+        self.table.upsert_many((record.key, record) for record in records)
+        self.record_count.set(f"{len(self.table)} records")
+        if self.verify.get():
+            self.verify_records(records)
+
+    def toggle_verify(self):
+        self.table.refresh()
+        if self.verify.get():
+            self.verify_records(list(self.table.rows))
+
+    def verify_records(self, records):
+        admin_keys = self.admin_keys.get().replace(",", " ").split()
+        if not admin_keys and self.public_key.get():
+            admin_keys = [self.public_key.get()]
+        self.verifier.admin_keys = set(admin_keys)
+        self.controller.run_async(
+            self.verifier.verify(records), on_done=self.verify_finished
+        )
+
+    def verify_finished(self, future):
+        self.table.refresh()
+        if future.exception():
+            self.output_text.log(
+                f"Verification failed: {future.exception()}", ERROR
+            )
+            return
+        statuses = future.result()
+        bad = sum(status in (INVALID, NOT_ADMIN) for status in statuses)
+        self.output_text.log(
+            f"Verified {len(statuses)} records: {bad} invalid or not from an "
+            f"admin key, {statuses.count(UNSIGNED)} unsigned",
+            WARNING if bad else INFO,
         )
-        asyncio.run(event.query_relays(query_dict))
 
     def clear_output(self):
-        self.output_text.delete("1.0", tk.END)
-        for item in self.treeview.get_children():
-            self.treeview.delete(item)
+        self.output_text.clear()
+        self.table.clear()
+        self.record_count.set("0 records")
 
     def change_text_color(self, color):
-        self.output_text.config(fg=color)
+        self.output_text.set_foreground(color)
@@ -0,0 +1,102 @@
+import json
+from nostpy_gui.records import HEX64, MODERATION_KIND
+
+TARGET_TYPES = ("client_pub", "kind")
+
+
+class PolicyError(ValueError):
+    pass
+
+
+def load_policy(path) -> dict:
+    with open(path, encoding="utf-8") as handle:
+        try:
+            data = json.load(handle)
+        except json.JSONDecodeError as exc:
+            raise PolicyError(f"{path} is not valid JSON: {exc}") from exc
+    return parse_policy(data)
+
+
+def normalize_value(obj_type, value) -> str:
+    # Targets compare as strings: lowercase hex pubkeys, kinds as integers
+    if obj_type == "client_pub":
+        value = str(value).strip().lower()
+        if not HEX64.match(value):
+            raise PolicyError(f"client_pub {value!r} is not 64 hex characters")
+        return value
+    try:
+        return str(int(value))
+    except (TypeError, ValueError):
+        raise PolicyError(f"kind {value!r} is not an integer") from None
+
+
+def parse_policy(data) -> dict:
+    # {"allow": {"client_pub": [...], "kind": [...]}, "ban": {...}} becomes
+    # {(type, value): allowed}, the same shape as current_state
+    if not isinstance(data, dict):
+        raise PolicyError("Policy must be a JSON object")
+    desired = {}
+    for verb, allowed in (("allow", True), ("ban", False)):
+        section = data.get(verb) or {}
+        if not isinstance(section, dict):
+            raise PolicyError(f'"{verb}" must map target types to lists')
+        for obj_type, values in section.items():
+            if obj_type not in TARGET_TYPES:
+                raise PolicyError(f"Unknown target type {obj_type!r} under {verb!r}")
+            if not isinstance(values, list):
+                raise PolicyError(f"{verb}.{obj_type} must be a list")
+            for value in values:
+                target = (obj_type, normalize_value(obj_type, value))
+                if desired.get(target, allowed) != allowed:
+                    raise PolicyError(f"{obj_type} {value} is both allowed and banned")
+                desired[target] = allowed
+    return desired
+
+
+def record_state(record):
+    # A 42021 record as ((type, value), allowed), None if it targets nothing
+    client_pub = record.get("client_pub")
+    kind = record.get("kind")
+    if client_pub:
+        target = ("client_pub", client_pub.lower())
+    elif kind is not None:
+        target = ("kind", str(kind))
+    else:
+        return None
+    return target, str(record.get("allowed")).lower() in ("true", "1")
+
+
+def current_state(records) -> dict:
+    # records are already merged down to the newest per target
+    state = {}
+    for record in records:
+        entry = record_state(record)
+        if entry is not None:
+            state[entry[0]] = entry[1]
+    return state
+
+
+def spec_for(target, allowed) -> tuple:
+    obj_type, value = target
+    return ("", MODERATION_KIND, [["allow" if allowed else "ban", obj_type, value]])
+
+
+def plan(desired, current) -> list:
+    # Only targets the relay is missing or has the other way round need an
+    # event; targets the policy doesn't mention are left as they are
+    changes = set(desired.items()) - set(current.items())
+    return [spec_for(target, allowed) for target, allowed in sorted(changes)]
+
+
+async def plan_reconcile(event, desired, timeout=5) -> dict:
+    # {relay: specs}, or the exception for a relay whose state couldn't be
+    # read in full (fetch_state returns IncompleteQuery for one cut short),
+    # nothing should be sent there blind
+    states = await event.fetch_state({"kinds": [MODERATION_KIND]}, timeout)
+    plans = {}
+    for relay, records in states.items():
+        if isinstance(records, BaseException):
+            plans[relay] = records
+        else:
+            plans[relay] = plan(desired, current_state(records))
+    return plans
@@ -0,0 +1,211 @@
+import json
+import re
+import struct
+
+MODERATION_KIND = 42021
+ALLOWLIST_FIELDS = ("client_pub", "kind", "allowed", "note_id", "created_at")
+EVENT_FIELDS = ("id", "pubkey", "sig")
+# Event ids and pubkeys, lowercase as relays send them
+HEX64 = re.compile(r"^[0-9a-f]{64}$")
+HEX128 = re.compile(r"^[0-9a-f]{128}$")
+
+# client_pub, note_id, created_at, kind, flags
+HEADER = struct.Struct("<32s32sqHB")
+# id, pubkey, sig of a signed event, right after the header
+EVENT = struct.Struct("<32s32s64s")
+CREATED_AT = struct.Struct("<q")
+KIND = struct.Struct("<H")
+FLAGS_AT = HEADER.size - 1
+HAS_CLIENT_PUB = 1
+HAS_NOTE_ID = 2
+HAS_CREATED_AT = 4
+HAS_KIND = 8
+ALLOWED = 16
+DENIED = 32
+HAS_TAIL = 64
+HAS_EVENT = 128
+INT64_MIN = -(1 << 63)
+INT64_MAX = (1 << 63) - 1
+
+
+def is_hex64(value) -> bool:
+    return isinstance(value, str) and HEX64.match(value) is not None
+
+
+def is_int(value, low, high) -> bool:
+    return (
+        isinstance(value, int)
+        and not isinstance(value, bool)
+        and low <= value <= high
+    )
+
+
+class AllowlistRecord(bytes):
+    # A 42021 allowlist record as one bytes object: both hex fields as raw
+    # bytes, created_at, kind and allowed in a fixed header, and whatever
+    # doesn't fit there (string kinds, extra keys) in a JSON tail. No
+    # __dict__, slots or GC header per record, about a quarter of the
+    # dict's memory. Signed events, which filtered lookups return, also
+    # get their id, pubkey and sig packed; tags and content stay compact
+    # JSON text in the tail. Values come back through get(), row() and
+    # to_dict()
+    __slots__ = ()
+
+    @classmethod
+    def from_dict(cls, record: dict) -> "AllowlistRecord":
+        flags = 0
+        event = b""
+        if (
+            is_hex64(record.get("id"))
+            and is_hex64(record.get("pubkey"))
+            and isinstance(record.get("sig"), str)
+            and HEX128.match(record["sig"])
+        ):
+            flags |= HAS_EVENT
+            event = EVENT.pack(
+                bytes.fromhex(record["id"]),
+                bytes.fromhex(record["pubkey"]),
+                bytes.fromhex(record["sig"]),
+            )
+        packed_keys = EVENT_FIELDS if flags & HAS_EVENT else ()
+        tail = {
+            key: value
+            for key, value in record.items()
+            if key not in ALLOWLIST_FIELDS and key not in packed_keys
+        }
+        client_pub = record.get("client_pub")
+        if is_hex64(client_pub):
+            flags |= HAS_CLIENT_PUB
+        elif client_pub is not None:
+            tail["client_pub"] = client_pub
+        note_id = record.get("note_id")
+        if is_hex64(note_id):
+            flags |= HAS_NOTE_ID
+        elif note_id is not None:
+            tail["note_id"] = note_id
+        created_at = record.get("created_at")
+        if is_int(created_at, INT64_MIN, INT64_MAX):
+            flags |= HAS_CREATED_AT
+        elif created_at is not None:
+            tail["created_at"] = created_at
+        kind = record.get("kind")
+        if is_int(kind, 0, 0xFFFF):
+            flags |= HAS_KIND
+        elif kind is not None:
+            tail["kind"] = kind
+        allowed = record.get("allowed")
+        if allowed is True:
+            flags |= ALLOWED
+        elif allowed is False:
+            flags |= DENIED
+        elif allowed is not None:
+            tail["allowed"] = allowed
+        if tail:
+            flags |= HAS_TAIL
+        packed = HEADER.pack(
+            bytes.fromhex(client_pub) if flags & HAS_CLIENT_PUB else b"",
+            bytes.fromhex(note_id) if flags & HAS_NOTE_ID else b"",
+            created_at if flags & HAS_CREATED_AT else 0,
+            kind if flags & HAS_KIND else 0,
+            flags,
+        )
+        packed += event
+        if tail:
+            packed += json.dumps(tail, separators=(",", ":")).encode()
+        return cls(packed)
+
+    def _tail(self) -> dict:
+        flags = self[FLAGS_AT]
+        if flags & HAS_TAIL:
+            start = HEADER.size + (EVENT.size if flags & HAS_EVENT else 0)
+            return json.loads(self[start:])
+        return {}
+
+    def get(self, key, default=None):
+        # Read like the dict it came from, for code written against those
+        flags = self[FLAGS_AT]
+        if key == "client_pub" and flags & HAS_CLIENT_PUB:
+            return self[:32].hex()
+        if key == "note_id" and flags & HAS_NOTE_ID:
+            return self[32:64].hex()
+        if key == "created_at" and flags & HAS_CREATED_AT:
+            return CREATED_AT.unpack_from(self, 64)[0]
+        if key == "kind" and flags & HAS_KIND:
+            return KIND.unpack_from(self, 72)[0]
+        if key == "allowed" and flags & (ALLOWED | DENIED):
+            return bool(flags & ALLOWED)
+        if key in EVENT_FIELDS and flags & HAS_EVENT:
+            return EVENT.unpack_from(self, HEADER.size)[EVENT_FIELDS.index(key)].hex()
+        value = self._tail().get(key)
+        return default if value is None else value
+
+    @property
+    def created_at(self):
+        if self[FLAGS_AT] & HAS_CREATED_AT:
+            return CREATED_AT.unpack_from(self, 64)[0]
+        return self.get("created_at")
+
+    @property
+    def kind(self):
+        return self.get("kind")
+
+    @property
+    def target(self):
+        # Hashable key for what the record moderates. Pubkey records, the
+        # bulk of any allowlist, key on the pubkey bytes alone rather than
+        # a tuple per record. None if it moderates nothing: a signed event's
+        # kind is its own, not a banned kind
+        flags = self[FLAGS_AT]
+        if flags & HAS_CLIENT_PUB and not flags & (HAS_KIND | HAS_TAIL):
+            return self[:32]
+        if flags & HAS_CLIENT_PUB:
+            client_pub = self[:32]
+        else:
+            client_pub = self.get("client_pub")
+        kind = self.kind
+        if not client_pub and (kind is None or self.get("sig") is not None):
+            return None
+        if kind is None:
+            return client_pub
+        return (client_pub, kind)
+
+    @property
+    def key(self):
+        # What merging and the table go by: the target, so only the newest
+        # record per target is kept, else the event id (or the whole
+        # record), so records without a target each stay their own row
+        target = self.target
+        if target is not None:
+            return target
+        return self.get("id") or bytes(self)
+
+    def row(self) -> tuple:
+        kind = self.get("kind")
+        allowed = self.get("allowed")
+        return (
+            self.get("client_pub", ""),
+            "" if kind is None else kind,
+            "" if allowed is None else allowed,
+            self.get("note_id", ""),
+        )
+
+    def to_dict(self) -> dict:
+        if not self[FLAGS_AT] & HAS_EVENT:
+            record = {field: self.get(field) for field in ALLOWLIST_FIELDS}
+            record.update(self._tail())
+            return record
+        # A signed event has none of the allowlist fields besides kind and
+        # created_at, only those it does have come back
+        record = {
+            "id": self.get("id"),
+            "pubkey": self.get("pubkey"),
+            "created_at": self.get("created_at"),
+            "kind": self.get("kind"),
+        }
+        record.update(self._tail())
+        record["sig"] = self.get("sig")
+        for field in ALLOWLIST_FIELDS:
+            value = self.get(field)
+            if value is not None:
+                record.setdefault(field, value)
+        return record
@@ -0,0 +1,162 @@
+import hashlib
+import json
+import multiprocessing
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+CHUNK_SIZE = 256
+
+_worker_key = None
+
+
+def calc_event_id(
+    public_key: str, created_at: int, kind_number: int, tags: list, content: str
+) -> str:
+    data = [0, public_key, created_at, kind_number, tags, content]
+    data_str = json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(data_str.encode("UTF-8")).hexdigest()
+
+
+def private_key_from_hex(private_key_hex: str):
+    # secp256k1 is imported on first use so it stays off the startup path
+    import secp256k1
+
+    return secp256k1.PrivateKey(bytes.fromhex(private_key_hex))
+
+
+def public_key_from_private(private_key_hex: str) -> str:
+    # x-only (BIP-340) public key, as used in nostr events
+    return private_key_from_hex(private_key_hex).pubkey.serialize()[1:].hex()
+
+
+def sign_event_id(event_id: str, private_key) -> str:
+    sig = private_key.schnorr_sign(bytes.fromhex(event_id), bip340tag=None, raw=True)
+    return sig.hex()
+
+
+def verify_event_sig(event_id: str, pubkey: str, sig: str) -> bool:
+    import secp256k1
+
+    pub_key = secp256k1.PublicKey(bytes.fromhex("02" + pubkey), True)
+    return pub_key.schnorr_verify(
+        bytes.fromhex(event_id), bytes.fromhex(sig), None, raw=True
+    )
+
+
+def check_sig(event_id: str, pubkey: str, sig: str) -> bool:
+    # verify_event_sig, with malformed keys and signatures counting as invalid
+    try:
+        return bool(verify_event_sig(event_id, pubkey, sig))
+    except Exception:
+        return False
+
+
+def build_event(private_key, public_key, created_at, content, kind, tags) -> dict:
+    event_id = calc_event_id(public_key, created_at, kind, tags, content)
+    return {
+        "id": event_id,
+        "pubkey": public_key,
+        "kind": kind,
+        "created_at": created_at,
+        "tags": tags,
+        "content": content,
+        "sig": sign_event_id(event_id, private_key),
+    }
+
+
+def process_pool(workers, initializer=None, initargs=()):
+    # Pools are created from the asyncio worker thread, and forking a
+    # threaded process can deadlock the child, so workers are spawned
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=initializer,
+        initargs=initargs,
+    )
+
+
+def _init_worker(private_key_hex):
+    # Each worker parses the key once instead of once per event
+    global _worker_key
+    _worker_key = private_key_from_hex(private_key_hex)
+
+
+def _build_chunk(args):
+    public_key, created_at, specs = args
+    return [
+        build_event(_worker_key, public_key, created_at, content, kind, tags)
+        for content, kind, tags in specs
+    ]
+
+
+def signing_pool(private_key_hex, workers=None):
+    # For callers signing batch after batch, e.g. an archive replay, so the
+    # workers are spawned (and parse the key) once; pass it to build_events
+    # and shut it down when done
+    return process_pool(
+        workers or os.cpu_count() or 1, _init_worker, (private_key_hex,)
+    )
+
+
+def build_events(
+    private_key_hex,
+    public_key,
+    specs,
+    created_at,
+    workers=None,
+    chunk_size=CHUNK_SIZE,
+    pool=None,
+) -> list:
+    specs = list(specs)
+    workers = workers or os.cpu_count() or 1
+    if pool is None and (workers == 1 or len(specs) <= chunk_size):
+        private_key = private_key_from_hex(private_key_hex)
+        return [
+            build_event(private_key, public_key, created_at, content, kind, tags)
+            for content, kind, tags in specs
+        ]
+    chunks = [
+        (public_key, created_at, specs[start : start + chunk_size])
+        for start in range(0, len(specs), chunk_size)
+    ]
+    events = []
+    if pool is not None:
+        for chunk in pool.map(_build_chunk, chunks):
+            events.extend(chunk)
+        return events
+    with signing_pool(private_key_hex, workers) as pool:
+        for chunk in pool.map(_build_chunk, chunks):
+            events.extend(chunk)
+    return events
+
+
+def _check_chunk(triples):
+    return [check_sig(event_id, pubkey, sig) for event_id, pubkey, sig in triples]
+
+
+def check_sigs(triples, workers=None, chunk_size=CHUNK_SIZE) -> list:
+    # (event_id, pubkey, sig) triples to booleans, spread over worker
+    # processes the same way build_events is
+    triples = list(triples)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(triples) <= chunk_size:
+        return _check_chunk(triples)
+    chunks = [
+        triples[start : start + chunk_size]
+        for start in range(0, len(triples), chunk_size)
+    ]
+    results = []
+    with process_pool(workers) as pool:
+        for chunk in pool.map(_check_chunk, chunks):
+            results.extend(chunk)
+    return results
+
+
+def sample_for_verification(events, sample_rate) -> list:
+    if sample_rate >= 1:
+        return list(events)
+    if sample_rate <= 0 or not events:
+        return []
+    count = max(1, int(len(events) * sample_rate))
+    return random.sample(list(events), count)
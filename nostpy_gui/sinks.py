@@ -0,0 +1,30 @@
+import json
+import sys
+import threading
+import time
+from logging import INFO, getLevelName
+
+
+class NullSink:
+    def log(self, text, level=INFO):
+        pass
+
+
+class JsonLinesSink:
+    # One JSON object per line, for cron jobs and CI logs
+    def __init__(self, stream=None, min_level=INFO):
+        self.stream = stream or sys.stdout
+        self.min_level = min_level
+        self._lock = threading.Lock()
+
+    def log(self, text, level=INFO):
+        if level >= self.min_level:
+            self.emit(
+                {"type": "log", "level": getLevelName(level).lower(), "message": text}
+            )
+
+    def emit(self, obj):
+        line = json.dumps(dict(obj, ts=round(time.time(), 3)), default=str)
+        with self._lock:
+            self.stream.write(line + "\n")
+            self.stream.flush()
@@ -0,0 +1,117 @@
+import json
+import os
+import sqlite3
+import threading
+
+DEFAULT_DB_PATH = os.path.join(os.path.expanduser("~"), ".nostpy_gui", "allowlist.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    relay TEXT NOT NULL,
+    client_pub TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    allowed TEXT,
+    note_id TEXT,
+    created_at INTEGER,
+    record TEXT NOT NULL,
+    PRIMARY KEY (relay, client_pub, kind)
+);
+CREATE INDEX IF NOT EXISTS records_client_pub ON records (client_pub);
+CREATE INDEX IF NOT EXISTS records_kind ON records (kind);
+CREATE TABLE IF NOT EXISTS sync_state (
+    relay TEXT PRIMARY KEY,
+    last_created_at INTEGER NOT NULL
+);
+"""
+
+
+def _row(relay, record):
+    kind = record.get("kind")
+    return (
+        relay,
+        record.get("client_pub") or "",
+        "" if kind is None else str(kind),
+        str(record.get("allowed", "")),
+        record.get("note_id"),
+        record.get("created_at") or 0,
+        json.dumps(record),
+    )
+
+
+class AllowlistStore:
+    # Local mirror of each relay's 42021 moderation records, so the query
+    # page opens from cache and later syncs only ask for what is new
+    def __init__(self, path=DEFAULT_DB_PATH):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.executescript(SCHEMA)
+
+    def save(self, relay, records):
+        rows = [_row(relay, record) for record in records]
+        if not rows:
+            return
+        with self._lock, self._conn:
+            # Only replace a stored record with one at least as new
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO records VALUES (?, ?, ?, ?, ?, ?, ?)", rows
+            )
+            self._conn.executemany(
+                "UPDATE records SET allowed = ?, note_id = ?, created_at = ?, "
+                "record = ? WHERE relay = ? AND client_pub = ? AND kind = ? "
+                "AND created_at <= ?",
+                [row[3:] + row[:3] + (row[5],) for row in rows],
+            )
+
+    def mark_synced(self, relay, created_at):
+        # Called once a sync has everything up to created_at; saving a batch
+        # doesn't move the cursor, a sync cut short would otherwise resume
+        # past the older pages it never got
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO sync_state VALUES (?, 0)", (relay,)
+            )
+            self._conn.execute(
+                "UPDATE sync_state SET last_created_at = ? "
+                "WHERE relay = ? AND last_created_at < ?",
+                (created_at, relay, created_at),
+            )
+
+    def last_synced(self, relay):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT last_created_at FROM sync_state WHERE relay = ?", (relay,)
+            ).fetchone()
+        return row[0] if row and row[0] else None
+
+    def load(self, relays) -> list:
+        return self._select("relay = ?", relays)
+
+    def search(self, relays, prefix, limit=1000) -> list:
+        # Range scan on the client_pub index rather than LIKE, which SQLite
+        # only runs off an index under case-sensitive settings
+        return self._select(
+            "relay = ? AND client_pub >= ? AND client_pub < ?",
+            relays,
+            (prefix, prefix + "\uffff"),
+            limit,
+        )
+
+    def _select(self, where, relays, params=(), limit=None) -> list:
+        sql = f"SELECT record FROM records WHERE {where} ORDER BY client_pub, kind"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        records = []
+        with self._lock:
+            for relay in relays:
+                records.extend(
+                    json.loads(row[0])
+                    for row in self._conn.execute(sql, (relay,) + tuple(params))
+                )
+        return records
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,187 @@
+import asyncio
+import uuid
+import weakref
+
+from nostpy_gui import protocol
+from nostpy_gui.metrics import recorder
+from nostpy_gui.pool import get_pool, is_open
+
+CONNECTION_LOST = "connection lost"
+
+
+def new_sub_id() -> str:
+    return f"nostpy-{uuid.uuid4().hex[:12]}"
+
+
+class Subscription:
+    def __init__(self, session, sub_id, filters):
+        self.session = session
+        self.sub_id = sub_id
+        self.filters = filters
+        self.queue = asyncio.Queue()
+        self.closed_reason = None
+
+    async def next(self, timeout=None):
+        # EventMessage, EoseMessage, NoticeMessage or ClosedMessage; raises
+        # asyncio.TimeoutError when nothing arrives within timeout
+        if timeout is None:
+            return await self.queue.get()
+        return await asyncio.wait_for(self.queue.get(), timeout=timeout)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self.closed_reason is not None:
+            raise StopAsyncIteration
+        message = await self.next()
+        if isinstance(message, protocol.ClosedMessage):
+            self.closed_reason = message.message
+            raise StopAsyncIteration
+        return message
+
+    async def close(self):
+        await self.session.unsubscribe(self.sub_id)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+
+class RelaySession:
+    # One socket per relay shared by any number of concurrent
+    # subscriptions; a reader task routes frames to them by subscription id
+    def __init__(self, relay):
+        self.relay = relay
+        self._ws = None
+        self._reader = None
+        self._subs = {}
+        self._connecting = None
+
+    async def _ensure_connected(self):
+        if self._connecting is None:
+            self._connecting = asyncio.Lock()
+        async with self._connecting:
+            if self._ws is None or not is_open(self._ws):
+                # A dedicated socket, never leased back into the pool
+                self._ws = await get_pool().connect(self.relay)
+                self._reader = asyncio.ensure_future(self._read_loop(self._ws))
+
+    async def _read_loop(self, ws):
+        try:
+            async for raw in ws:
+                recorder.count(self.relay, bytes_in=len(raw))
+                try:
+                    message = protocol.decode(raw)
+                except protocol.ProtocolError:
+                    continue
+                if isinstance(message, protocol.NoticeMessage):
+                    # Notices aren't tied to a subscription, everyone hears them
+                    for subscription in self._subs.values():
+                        subscription.queue.put_nowait(message)
+                    continue
+                subscription = self._subs.get(getattr(message, "sub_id", None))
+                if subscription is None:
+                    continue
+                if isinstance(message, protocol.ClosedMessage):
+                    # The relay ended it, no CLOSE needed from our side
+                    del self._subs[message.sub_id]
+                subscription.queue.put_nowait(message)
+        except Exception:
+            pass
+        finally:
+            if ws is self._ws:
+                self._ws = None
+                for sub_id, subscription in list(self._subs.items()):
+                    subscription.queue.put_nowait(
+                        protocol.ClosedMessage(sub_id, CONNECTION_LOST)
+                    )
+                self._subs.clear()
+
+    async def send(self, frame):
+        # Reconnects if the socket dropped since the last frame
+        await self._ensure_connected()
+        await self._ws.send(frame)
+        recorder.count(self.relay, bytes_out=len(frame))
+
+    async def subscribe(self, *filters) -> Subscription:
+        await self._ensure_connected()
+        subscription = Subscription(self, new_sub_id(), list(filters))
+        self._subs[subscription.sub_id] = subscription
+        await self.send(protocol.encode("REQ", subscription.sub_id, *filters))
+        return subscription
+
+    async def count(self, *filters, timeout=5):
+        # NIP-45 COUNT, answered once with no CLOSE needed. Relays without
+        # COUNT support stay silent, send a NOTICE or CLOSED: all give None
+        await self._ensure_connected()
+        request = Subscription(self, new_sub_id(), list(filters))
+        self._subs[request.sub_id] = request
+        try:
+            await self.send(protocol.encode("COUNT", request.sub_id, *filters))
+            deadline = asyncio.get_event_loop().time() + timeout
+            while True:
+                remaining = deadline - asyncio.get_event_loop().time()
+                if remaining <= 0:
+                    return None
+                try:
+                    message = await request.next(timeout=remaining)
+                except asyncio.TimeoutError:
+                    return None
+                if isinstance(message, protocol.CountMessage):
+                    return message
+                if isinstance(
+                    message, (protocol.NoticeMessage, protocol.ClosedMessage)
+                ):
+                    return None
+        finally:
+            self._subs.pop(request.sub_id, None)
+
+    async def unsubscribe(self, sub_id):
+        if self._subs.pop(sub_id, None) is None:
+            return
+        if self._ws is None or not is_open(self._ws):
+            # Gone with the socket, not worth reconnecting for
+            return
+        try:
+            await self.send(protocol.encode("CLOSE", sub_id))
+        except Exception:
+            # The socket went away, so has the subscription
+            pass
+
+    async def close(self):
+        if self._ws is not None:
+            await self._ws.close()
+        if self._reader is not None:
+            await asyncio.gather(self._reader, return_exceptions=True)
+
+    @property
+    def active(self) -> int:
+        return len(self._subs)
+
+
+_sessions = weakref.WeakKeyDictionary()
+
+
+def get_session(relay) -> RelaySession:
+    # Sessions, like pooled sockets, belong to one event loop
+    sessions = _sessions.setdefault(asyncio.get_event_loop(), {})
+    session = sessions.get(relay)
+    if session is None:
+        session = sessions[relay] = RelaySession(relay)
+    return session
+
+
+async def close_sessions():
+    sessions = _sessions.pop(asyncio.get_event_loop(), {})
+    for session in sessions.values():
+        await session.close()
+
+
+async def prune_sessions(relays):
+    # Closes the sessions of relays no longer configured
+    sessions = _sessions.get(asyncio.get_event_loop(), {})
+    for relay in [relay for relay in sessions if relay not in relays]:
+        await sessions.pop(relay).close()
@@ -0,0 +1,106 @@
+from tkinter import ttk
+
+
+class VirtualTable(ttk.Frame):
+    # A Treeview that only ever holds as many items as fit on screen; the
+    # full result set lives in self.rows and scrolling just rewrites the
+    # values of the visible items. Rows can be any objects, render turns
+    # one into its column values when it scrolls into view and row_tags
+    # into its Treeview tags
+    def __init__(self, parent, columns, render=None, row_tags=None, **kwargs):
+        super().__init__(parent, **kwargs)
+        self.render = render
+        self.row_tags = row_tags
+        self.rows = []
+        self._index = {}
+        self._first = 0
+        self._visible = 20
+        self._items = []
+        self._redraw_pending = False
+
+        self.scrollbar = ttk.Scrollbar(
+            self, orient="vertical", command=self._on_scrollbar
+        )
+        self.scrollbar.pack(side="right", fill="y")
+        self.treeview = ttk.Treeview(self, columns=columns, show="headings")
+        for column in columns:
+            self.treeview.heading(column, text=column)
+        self.treeview.pack(side="left", fill="both", expand=True)
+
+        self.treeview.bind("<Configure>", self._on_resize)
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.treeview.bind(sequence, self._on_wheel)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def upsert_many(self, keyed_rows):
+        for key, row in keyed_rows:
+            index = self._index.get(key)
+            if index is None:
+                self._index[key] = len(self.rows)
+                self.rows.append(row)
+            else:
+                self.rows[index] = row
+        self._schedule_redraw()
+
+    def clear(self):
+        self.rows = []
+        self._index = {}
+        self._first = 0
+        self._schedule_redraw()
+
+    def refresh(self):
+        # Rows changed in place, e.g. a status render reads went stale
+        self._schedule_redraw()
+
+    def _schedule_redraw(self):
+        # Many batches can land between two frames, draw once for all of them
+        if not self._redraw_pending:
+            self._redraw_pending = True
+            self.after_idle(self._redraw)
+
+    def _on_resize(self, event):
+        rowheight = int(ttk.Style().lookup("Treeview", "rowheight") or 20)
+        # One row's worth of height goes to the headings
+        self._visible = max(1, event.height // rowheight - 1)
+        self._schedule_redraw()
+
+    def _redraw(self):
+        self._redraw_pending = False
+        self._first = max(0, min(self._first, len(self.rows) - self._visible))
+        window = self.rows[self._first : self._first + self._visible]
+
+        while len(self._items) < len(window):
+            self._items.append(self.treeview.insert("", "end"))
+        while len(self._items) > len(window):
+            self.treeview.delete(self._items.pop())
+        for item, row in zip(self._items, window):
+            tags = self.row_tags(row) if self.row_tags is not None else ()
+            if self.render is not None:
+                row = self.render(row)
+            self.treeview.item(item, values=row, tags=tags)
+
+        total = len(self.rows)
+        if total:
+            self.scrollbar.set(
+                self._first / total, (self._first + len(window)) / total
+            )
+        else:
+            self.scrollbar.set(0, 1)
+
+    def _on_scrollbar(self, action, amount, unit=None):
+        if action == "moveto":
+            self._first = int(float(amount) * len(self.rows))
+        elif action == "scroll":
+            step = self._visible if unit == "pages" else 1
+            self._first += int(amount) * step
+        self._redraw()
+
+    def _on_wheel(self, event):
+        if event.num == 4 or getattr(event, "delta", 0) > 0:
+            self._first -= 3
+        else:
+            self._first += 3
+        self._redraw()
+        return "break"
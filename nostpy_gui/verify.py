@@ -0,0 +1,96 @@
+import asyncio
+import threading
+from collections import OrderedDict
+from nostpy_gui import signing
+
+VALID = "valid"
+INVALID = "invalid"
+UNSIGNED = "unsigned"
+NOT_ADMIN = "not admin"
+CACHE_SIZE = 200000
+
+
+def as_event(record) -> dict:
+    return record.to_dict() if hasattr(record, "to_dict") else record
+
+
+class Verifier:
+    # Checks that records received from relays are events signed by one of
+    # admin_keys (any key when empty). Ids are recomputed every time, that
+    # is just a hash; the Schnorr checks run in worker processes and are
+    # cached by event id (and sig, the one part the id doesn't cover), so a
+    # re-sync only pays for events it hasn't seen. status() is called from
+    # the Tk thread while verify() fills the cache on the worker, hence the
+    # lock
+    def __init__(self, admin_keys=(), workers=None, cache_size=CACHE_SIZE):
+        self.admin_keys = set(admin_keys)
+        self.workers = workers
+        self.cache_size = cache_size
+        self._sig_ok = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _cached(self, key):
+        # A hit moves the entry to the back, what's evicted is what no page
+        # has looked at for longest
+        with self._lock:
+            sig_ok = self._sig_ok.get(key)
+            if sig_ok is not None:
+                self._sig_ok.move_to_end(key)
+            return sig_ok
+
+    def _recomputed_id(self, event):
+        try:
+            event_id = signing.calc_event_id(
+                event["pubkey"],
+                event["created_at"],
+                event["kind"],
+                event["tags"],
+                event["content"],
+            )
+        except (KeyError, TypeError, ValueError):
+            return None
+        return event_id if event_id == event.get("id") else None
+
+    def _status(self, event, sig_ok):
+        if not sig_ok:
+            return INVALID
+        if self.admin_keys and event["pubkey"] not in self.admin_keys:
+            return NOT_ADMIN
+        return VALID
+
+    def status(self, record):
+        # From the cache only, None while a record is still being checked
+        event = as_event(record)
+        if not event.get("sig"):
+            return UNSIGNED
+        event_id = self._recomputed_id(event)
+        if event_id is None:
+            return INVALID
+        sig_ok = self._cached((event_id, event["sig"]))
+        if sig_ok is None:
+            return None
+        return self._status(event, sig_ok)
+
+    async def verify(self, records) -> list:
+        # The status of each record, in order; signature checks run off the
+        # event loop
+        events = [as_event(record) for record in records]
+        pending = {}
+        for event in events:
+            if not event.get("sig"):
+                continue
+            event_id = self._recomputed_id(event)
+            key = (event_id, event["sig"])
+            if event_id is not None and self._cached(key) is None:
+                pending[key] = (event_id, event["pubkey"], event["sig"])
+        if pending:
+            loop = asyncio.get_event_loop()
+            results = await loop.run_in_executor(
+                None, signing.check_sigs, list(pending.values()), self.workers
+            )
+            with self._lock:
+                for key, sig_ok in zip(pending, results):
+                    self._sig_ok[key] = sig_ok
+                while len(self._sig_ok) > self.cache_size:
+                    self._sig_ok.popitem(last=False)
+        return [self.status(event) for event in events]
@@ -0,0 +1,126 @@
+import asyncio
+
+import pytest
+
+from nostpy_gui import archive
+from nostpy_gui.archive import (
+    ArchiveError,
+    NdjsonWriter,
+    export_query,
+    iter_batches,
+    replay,
+)
+from nostpy_gui.records import AllowlistRecord
+
+
+def record(index):
+    return {
+        "client_pub": f"{index:064x}",
+        "kind": None,
+        "allowed": index % 2 == 0,
+        "note_id": None,
+        "created_at": 100 + index,
+    }
+
+
+def test_round_trip_in_batches(tmp_path):
+    path = tmp_path / "out.ndjson"
+    records = [record(index) for index in range(25)]
+    with NdjsonWriter(path) as writer:
+        writer.write(records[:10])
+        writer.write([AllowlistRecord.from_dict(r) for r in records[10:]])
+    assert writer.count == 25
+    batches = list(iter_batches(path, batch_size=10))
+    assert [len(batch) for batch in batches] == [10, 10, 5]
+    assert [item for batch in batches for item in batch] == records
+
+
+def test_blank_lines_and_empty_files(tmp_path):
+    path = tmp_path / "out.ndjson"
+    path.write_text('\n{"a": 1}\n\n{"a": 2}')
+    assert list(iter_batches(path)) == [[{"a": 1}, {"a": 2}]]
+    path.write_text("")
+    assert list(iter_batches(path)) == []
+
+
+@pytest.mark.parametrize("line", ["{not json", "[1, 2]"])
+def test_bad_lines_name_the_line(tmp_path, line):
+    path = tmp_path / "out.ndjson"
+    path.write_text('{"a": 1}\n' + line + "\n")
+    with pytest.raises(ArchiveError, match=":2:"):
+        list(iter_batches(path))
+
+
+class FakeEvent:
+    # Two relays sending overlapping pages
+    def __init__(self, pages):
+        self.pages = pages
+
+    async def stream_query(self, query_dict, emit, timeout):
+        for relay, records in self.pages:
+            emit(relay, records)
+
+    def log(self, text, level):
+        pass
+
+
+def test_export_writes_raw_records_once(tmp_path):
+    path = tmp_path / "out.ndjson"
+    old = dict(record(1), id="1" * 64)
+    new = dict(record(1), id="2" * 64, created_at=500)
+    other = dict(record(2), id="3" * 64)
+    event = FakeEvent([("a", [old, new]), ("b", [new, other]), ("b", [other])])
+    assert asyncio.run(export_query(event, {}, path)) == 3
+    lines = [item for batch in iter_batches(path) for item in batch]
+    assert lines == [old, new, other]
+
+
+def test_export_only_remembers_recent_ids(tmp_path, monkeypatch):
+    monkeypatch.setattr(archive, "EXPORT_SEEN", 2)
+    path = tmp_path / "out.ndjson"
+    first, second, third = (dict(record(i), id=str(i) * 64) for i in (1, 2, 3))
+    event = FakeEvent([("a", [first, second, third]), ("b", [third, first])])
+    assert asyncio.run(export_query(event, {}, path)) == 4
+
+
+class ReplayEvent:
+    relays = ["a"]
+
+    def __init__(self):
+        self.specs = []
+
+    def signing_pool(self):
+        class Pool:
+            def shutdown(self):
+                pass
+
+        return Pool()
+
+    async def send_bulk(self, specs, window, pool):
+        self.specs.extend(specs)
+        return {}
+
+
+def test_replay_sends_the_newest_version_of_each_target_once(tmp_path):
+    path = tmp_path / "out.ndjson"
+    with NdjsonWriter(path) as writer:
+        writer.write(
+            [
+                dict(record(1), allowed=True, created_at=200),
+                dict(record(1), allowed=False, created_at=100),
+                dict(record(2), allowed=False, created_at=50),
+            ]
+        )
+        writer.write(
+            [
+                dict(record(1), allowed=False, created_at=50),
+                dict(record(2), allowed=True, created_at=300),
+                dict(record(2), allowed=True, created_at=300),
+            ]
+        )
+    event = ReplayEvent()
+    asyncio.run(replay(event, path, batch_size=2))
+    assert [spec[2][0] for spec in event.specs] == [
+        ["allow", "client_pub", record(1)["client_pub"]],
+        ["allow", "client_pub", record(2)["client_pub"]],
+    ]
@@ -0,0 +1,125 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from nostpy_gui.event import Event
+from nostpy_gui.filters import (
+    FilterError,
+    QueryCache,
+    build_filter,
+    filter_key,
+    normalize_filter,
+    parse_tags,
+    parse_time,
+)
+from nostpy_gui.records import MODERATION_KIND
+
+RELAY = "wss://relay.example"
+PUB_A = "ab" * 32
+PUB_B = "cd" * 32
+
+
+def test_build_filter_normalizes():
+    query = build_filter(
+        authors=[PUB_B.upper(), PUB_A, PUB_B],
+        tags={"p": [PUB_A.upper()], "t": ["spam", "ads", "spam"]},
+        since=10,
+        until=20,
+        limit="5",
+    )
+    assert query == {
+        "kinds": [MODERATION_KIND],
+        "authors": [PUB_A, PUB_B],
+        "#p": [PUB_A],
+        "#t": ["ads", "spam"],
+        "since": 10,
+        "until": 20,
+        "limit": 5,
+    }
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {"authors": ["abc"]},
+        {"tags": {"e": ["not hex"]}},
+        {"since": 20, "until": 10},
+        {"limit": 0},
+    ],
+)
+def test_build_filter_rejects(kwargs):
+    with pytest.raises(FilterError):
+        build_filter(**kwargs)
+
+
+def test_filter_key_ignores_order():
+    first = {"kinds": [1, 42021], "authors": [PUB_B, PUB_A]}
+    second = {"authors": [PUB_A, PUB_B, PUB_A], "kinds": [42021, 1]}
+    assert filter_key(first) == filter_key(second)
+    assert normalize_filter(second) == {"authors": [PUB_A, PUB_B], "kinds": [1, 42021]}
+
+
+def test_parse_tags():
+    assert parse_tags("p:abc, t:spam t:ads") == {"p": ["abc"], "t": ["spam", "ads"]}
+    for text in ("pabc", "pp:abc", "1:abc", "p:"):
+        with pytest.raises(FilterError):
+            parse_tags(text)
+
+
+def test_parse_time():
+    assert parse_time("") is None
+    assert parse_time("1700000000") == 1700000000
+    assert parse_time("2024-05-01 13:30") == int(
+        datetime(2024, 5, 1, 13, 30).timestamp()
+    )
+    with pytest.raises(FilterError):
+        parse_time("yesterday")
+
+
+def test_cache_hit_and_expiry():
+    cache = QueryCache()
+    cache.put(RELAY, {"kinds": [1, 2]}, ["a"])
+    assert cache.get(RELAY, {"kinds": [2, 1]}) == ["a"]
+    assert cache.get("wss://other.example", {"kinds": [1, 2]}) is None
+    expired = QueryCache(ttl=-1)
+    expired.put(RELAY, {"kinds": [1]}, ["a"])
+    assert expired.get(RELAY, {"kinds": [1]}) is None
+    assert expired.stats()["entries"] == 0
+
+
+def test_cache_evicts_least_recently_used():
+    cache = QueryCache(max_entries=2)
+    cache.put(RELAY, {"kinds": [1]}, ["1"])
+    cache.put(RELAY, {"kinds": [2]}, ["2"])
+    cache.get(RELAY, {"kinds": [1]})
+    cache.put(RELAY, {"kinds": [3]}, ["3"])
+    assert cache.get(RELAY, {"kinds": [1]}) == ["1"]
+    assert cache.get(RELAY, {"kinds": [2]}) is None
+    assert cache.get(RELAY, {"kinds": [3]}) == ["3"]
+
+
+def test_cache_skips_big_results_and_invalidates_per_relay():
+    cache = QueryCache(max_records=1)
+    cache.put(RELAY, {"kinds": [1]}, ["a", "b"])
+    assert cache.get(RELAY, {"kinds": [1]}) is None
+    cache.put(RELAY, {"kinds": [1]}, ["a"])
+    cache.put("wss://other.example", {"kinds": [1]}, ["b"])
+    cache.invalidate(RELAY)
+    assert cache.get(RELAY, {"kinds": [1]}) is None
+    assert cache.get("wss://other.example", {"kinds": [1]}) == ["b"]
+
+
+@pytest.mark.parametrize("complete", [True, False])
+def test_only_complete_answers_are_cached(complete):
+    async def query_relay(relay, query_dict, timeout, emit):
+        emit(relay, ["a"])
+        return 1, complete
+
+    cache = QueryCache()
+    event = Event([RELAY])
+    event._query_relay = query_relay
+    asyncio.run(
+        event._query_cached(RELAY, {"kinds": [1]}, 1, lambda *args: None, cache)
+    )
+    assert cache.get(RELAY, {"kinds": [1]}) == (["a"] if complete else None)
@@ -0,0 +1,27 @@
+import pytest
+
+from nostpy_gui.health import DOWN, UP, HealthRegistry, RelayUnavailable
+
+RELAY = "wss://relay.example"
+OTHER = "wss://other.example"
+
+
+def test_down_relays_fail_fast_until_their_retry():
+    registry = HealthRegistry(backoff_base=60)
+    registry.record_failure(RELAY, "refused")
+    with pytest.raises(RelayUnavailable):
+        registry.check(RELAY)
+    registry.record_success(RELAY, 0.05)
+    registry.check(RELAY)
+    assert registry.snapshot()[RELAY]["status"] == UP
+
+
+def test_track_drops_relays_no_longer_configured():
+    registry = HealthRegistry()
+    registry.track([RELAY, OTHER])
+    registry.record_success(RELAY)
+    registry.record_failure(OTHER, "refused")
+    registry.track([OTHER])
+    snapshot = registry.snapshot()
+    assert list(snapshot) == [OTHER]
+    assert snapshot[OTHER]["status"] == DOWN
@@ -0,0 +1,55 @@
+import asyncio
+
+from nostpy_gui import protocol
+from nostpy_gui.outbox import Outbox
+
+RELAY = "wss://relay.example"
+
+
+class FakeEvent:
+    def __init__(self, replies):
+        self.replies = replies
+        self.logged = []
+
+    async def deliver(self, relay, events, on_result, window, ok_timeout):
+        for event_data in events:
+            reply = self.replies.get(event_data["id"])
+            if reply is not None:
+                on_result(
+                    event_data["id"],
+                    protocol.OkMessage(event_data["id"], *reply),
+                )
+
+    def log(self, text, level):
+        self.logged.append(text)
+
+
+def flush(outbox, replies):
+    due = outbox.due(float("inf"))
+    asyncio.run(outbox._flush(FakeEvent(replies), due, window=10, ok_timeout=1))
+
+
+def pending(outbox):
+    return {
+        event_id: attempts
+        for event_id, _, _, attempts in outbox.due(float("inf"))
+    }
+
+
+def test_answered_events_leave_the_outbox():
+    outbox = Outbox(":memory:")
+    outbox.enqueue({"id": "accepted"}, [RELAY])
+    outbox.enqueue({"id": "rejected"}, [RELAY])
+    flush(outbox, {"accepted": (True, ""), "rejected": (False, "blocked: no")})
+    assert pending(outbox) == {}
+
+
+def test_rate_limited_and_unanswered_events_are_retried():
+    outbox = Outbox(":memory:")
+    outbox.enqueue({"id": "limited"}, [RELAY])
+    outbox.enqueue({"id": "silent"}, [RELAY])
+    flush(outbox, {"limited": (False, "rate-limited: slow down")})
+    assert pending(outbox) == {"limited": 1, "silent": 1}
+    assert outbox.stats()[RELAY]["next_attempt"] > outbox.stats()[RELAY][
+        "oldest_queued_at"
+    ]
@@ -0,0 +1,90 @@
+import asyncio
+
+from nostpy_gui import event as event_module
+from nostpy_gui.event import PAGE_SIZE, Event
+from nostpy_gui.store import AllowlistStore
+
+RELAY = "wss://relay.example"
+BULK_SECOND = 1000
+
+
+def record(index, created_at):
+    return {
+        "id": f"{index:064x}",
+        "client_pub": f"{index:064x}",
+        "kind": None,
+        "allowed": False,
+        "note_id": None,
+        "created_at": created_at,
+    }
+
+
+# A bulk ban signed in one second, between older and newer records
+RECORDS = (
+    [record(index, 2000 + index) for index in range(100)]
+    + [record(100 + index, BULK_SECOND) for index in range(1200)]
+    + [record(1300 + index, 500 - index) for index in range(300)]
+)
+
+
+def fake_relay(records, answered=None):
+    # Honours since/until/limit like a relay, newest first
+    async def query_page(session, query, timeout, emit):
+        if answered is not None:
+            answered.append(query)
+        matching = sorted(
+            (
+                r
+                for r in records
+                if query.get("since", 0) <= r["created_at"]
+                and r["created_at"] <= query.get("until", float("inf"))
+            ),
+            key=lambda r: -r["created_at"],
+        )[: query.get("limit")]
+        if matching:
+            emit(session.relay, matching)
+        oldest = min((r["created_at"] for r in matching), default=None)
+        return len(matching), oldest, True
+
+    return query_page
+
+
+def make_event(monkeypatch, records, answered=None):
+    class Session:
+        relay = RELAY
+
+    monkeypatch.setattr(event_module, "get_session", lambda relay: Session())
+    event = Event([RELAY])
+    event._query_page = fake_relay(records, answered)
+    return event
+
+
+def test_records_sharing_a_second_are_all_fetched(monkeypatch):
+    event = make_event(monkeypatch, RECORDS)
+    records = asyncio.run(event.query_relays({"kinds": [42021]}))
+    assert len(records) == len(RECORDS)
+
+
+def test_a_full_second_is_fetched_without_a_limit(monkeypatch):
+    answered = []
+    event = make_event(monkeypatch, RECORDS[100:1300], answered)
+    seen = set()
+    total, complete = asyncio.run(
+        event._query_relay(
+            RELAY,
+            {"kinds": [42021]},
+            5,
+            lambda relay, records: seen.update(r["id"] for r in records),
+        )
+    )
+    assert complete and len(seen) == 1200
+    assert {"kinds": [42021], "since": BULK_SECOND, "until": BULK_SECOND} in answered
+    assert all(query.get("limit", PAGE_SIZE) == PAGE_SIZE for query in answered[:2])
+
+
+def test_sync_mirrors_a_bulk_second(monkeypatch):
+    store = AllowlistStore(":memory:")
+    event = make_event(monkeypatch, RECORDS)
+    asyncio.run(event.query_relays({"kinds": [42021]}, store=store))
+    assert len(store.load([RELAY])) == len(RECORDS)
+    assert store.last_synced(RELAY) == 2099
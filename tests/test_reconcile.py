@@ -0,0 +1,101 @@
+import asyncio
+
+import pytest
+
+from nostpy_gui.event import IncompleteQuery
+from nostpy_gui.reconcile import (
+    PolicyError,
+    current_state,
+    parse_policy,
+    plan,
+    plan_reconcile,
+    spec_for,
+)
+
+PUB_A = "ab" * 32
+PUB_B = "cd" * 32
+
+
+def record(client_pub=None, kind=None, allowed=True):
+    return {
+        "client_pub": client_pub,
+        "kind": kind,
+        "allowed": allowed,
+        "note_id": None,
+        "created_at": 1,
+    }
+
+
+def test_parse_policy_normalizes_targets():
+    desired = parse_policy(
+        {"allow": {"client_pub": [PUB_A.upper()]}, "ban": {"kind": [4, "7"]}}
+    )
+    assert desired == {
+        ("client_pub", PUB_A): True,
+        ("kind", "4"): False,
+        ("kind", "7"): False,
+    }
+
+
+@pytest.mark.parametrize(
+    "policy",
+    [
+        {"allow": {"client_pub": ["not hex"]}},
+        {"allow": {"kind": ["one"]}},
+        {"allow": {"pubkey": [PUB_A]}},
+        {"allow": {"client_pub": PUB_A}},
+        {"allow": {"kind": [1]}, "ban": {"kind": [1]}},
+        [],
+    ],
+)
+def test_parse_policy_rejects_bad_policies(policy):
+    with pytest.raises(PolicyError):
+        parse_policy(policy)
+
+
+def test_plan_sends_only_missing_and_flipped_targets():
+    desired = parse_policy(
+        {"allow": {"client_pub": [PUB_A, PUB_B]}, "ban": {"kind": [4]}}
+    )
+    current = current_state(
+        [
+            record(client_pub=PUB_A, allowed=True),
+            record(client_pub=PUB_B, allowed=False),
+            record(kind=1, allowed=False),
+        ]
+    )
+    assert plan(desired, current) == [
+        spec_for(("client_pub", PUB_B), True),
+        spec_for(("kind", "4"), False),
+    ]
+
+
+def test_plan_matches_uppercase_policy_keys():
+    desired = parse_policy({"allow": {"client_pub": [PUB_A.upper()]}})
+    current = current_state([record(client_pub=PUB_A, allowed=True)])
+    assert plan(desired, current) == []
+
+
+def test_current_state_reads_string_allowed_flags():
+    state = current_state(
+        [record(client_pub=PUB_A, allowed="true"), record(kind=3, allowed="0")]
+    )
+    assert state == {("client_pub", PUB_A): True, ("kind", "3"): False}
+
+
+class FakeEvent:
+    def __init__(self, states):
+        self.states = states
+
+    async def fetch_state(self, query_dict, timeout=5):
+        return self.states
+
+
+def test_plan_reconcile_skips_relays_read_only_in_part():
+    desired = parse_policy({"allow": {"client_pub": [PUB_A]}})
+    partial = IncompleteQuery("wss://b didn't finish")
+    plans = asyncio.run(
+        plan_reconcile(FakeEvent({"wss://a": [], "wss://b": partial}), desired)
+    )
+    assert plans["wss://a"] == [spec_for(("client_pub", PUB_A), True)]
+    assert plans["wss://b"] is partial
@@ -0,0 +1,110 @@
+import pytest
+
+from nostpy_gui.event import RecordMerger, merge_records, record_id
+from nostpy_gui.records import HEADER, AllowlistRecord
+
+PUB_A = "ab" * 32
+PUB_B = "cd" * 32
+NOTE = "ef" * 32
+
+
+def record(client_pub=PUB_A, allowed=True, created_at=100, **fields):
+    return dict(
+        {
+            "client_pub": client_pub,
+            "kind": None,
+            "allowed": allowed,
+            "note_id": NOTE,
+            "created_at": created_at,
+        },
+        **fields,
+    )
+
+
+@pytest.mark.parametrize(
+    "raw",
+    [
+        record(),
+        record(allowed=False, kind=4),
+        record(client_pub=None, kind=70000, note_id=None, created_at=None),
+        record(client_pub=PUB_A.upper(), allowed="true", kind="1"),
+        record(id="1" * 64, tags=[["p", PUB_B]]),
+    ],
+)
+def test_round_trip(raw):
+    assert AllowlistRecord.from_dict(raw).to_dict() == raw
+
+
+def test_common_records_are_just_the_header():
+    assert len(AllowlistRecord.from_dict(record())) == HEADER.size
+
+
+def test_target():
+    assert AllowlistRecord.from_dict(record()).target == bytes.fromhex(PUB_A)
+    assert AllowlistRecord.from_dict(record(kind=4)).target == (
+        bytes.fromhex(PUB_A),
+        4,
+    )
+
+
+def test_row():
+    assert AllowlistRecord.from_dict(record(note_id=None)).row() == (
+        PUB_A,
+        "",
+        True,
+        "",
+    )
+
+
+def test_merger_keeps_the_newest_record_per_target():
+    merger = RecordMerger()
+    changed = merger.add([record(), record(), record(allowed=False, created_at=200)])
+    assert [r.get("allowed") for r in changed] == [False]
+    assert merger.add([record(created_at=150)]) == []
+    merger.add([record(client_pub=PUB_B)])
+    assert sorted(r.get("client_pub") for r in merger.records()) == [PUB_A, PUB_B]
+
+
+def test_record_id_does_not_collide_on_note_id():
+    assert record_id(record()) != record_id(record(client_pub=PUB_B))
+
+
+def signed_event(index):
+    return {
+        "id": f"{index:064x}",
+        "pubkey": PUB_A,
+        "created_at": 100,
+        "kind": 42021,
+        "tags": [["ban", "client_pub", PUB_B]],
+        "content": "",
+        "sig": "00" * 64,
+    }
+
+
+def test_signed_events_have_no_target():
+    event = AllowlistRecord.from_dict(signed_event(1))
+    assert event.target is None
+    assert event.key == signed_event(1)["id"]
+    kind_record = AllowlistRecord.from_dict(record(client_pub=None, kind=4))
+    assert kind_record.target == (None, 4)
+
+
+def test_merger_keeps_records_without_a_target_apart():
+    merged = merge_records([[signed_event(1), signed_event(2)], [signed_event(1)]])
+    assert sorted(r.get("id") for r in merged) == [
+        signed_event(1)["id"],
+        signed_event(2)["id"],
+    ]
+
+
+def test_signed_events_pack_id_pubkey_and_sig():
+    event = signed_event(1)
+    packed = AllowlistRecord.from_dict(event)
+    assert packed.to_dict() == event
+    assert list(packed.to_dict()) == list(event)
+    assert packed.get("sig") == event["sig"]
+    # Anything that doesn't fit the layout still comes back, from the tail
+    unpacked = AllowlistRecord.from_dict(dict(event, sig="not hex")).to_dict()
+    assert {k: v for k, v in unpacked.items() if v is not None} == dict(
+        event, sig="not hex"
+    )
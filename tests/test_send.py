@@ -0,0 +1,67 @@
+import asyncio
+
+from nostpy_gui import event as event_module
+from nostpy_gui import protocol
+from nostpy_gui.event import Event
+
+RELAY = "wss://relay.example"
+SPEC = ("", 42021, [["ban", "client_pub", "ab" * 32]])
+
+
+class FakeSocket:
+    # Answers every EVENT with an OK, and records what was sent
+    def __init__(self):
+        self.sent = []
+        self.replies = asyncio.Queue()
+
+    async def send(self, frame):
+        event_data = protocol.loads(frame)[1]
+        self.sent.append(event_data["id"])
+        await self.replies.put(protocol.dumps(["OK", event_data["id"], True, ""]))
+
+    async def recv(self):
+        return await self.replies.get()
+
+
+def run_with_socket(monkeypatch, coro_factory):
+    async def main():
+        socket = FakeSocket()
+
+        class Pool:
+            async def run(self, relay, exchange):
+                return await exchange(socket)
+
+        monkeypatch.setattr(event_module, "get_pool", lambda: Pool())
+        return await coro_factory(), socket.sent
+
+    return asyncio.run(main())
+
+
+def event_with_key():
+    import secp256k1
+
+    key = secp256k1.PrivateKey()
+    return Event(
+        [RELAY],
+        public_key=key.pubkey.serialize()[1:].hex(),
+        private_key_hex=key.private_key.hex(),
+    )
+
+
+def test_a_spec_listed_twice_is_sent_once(monkeypatch):
+    event = event_with_key()
+    report, sent = run_with_socket(
+        monkeypatch, lambda: event.send_bulk([SPEC, SPEC], ok_timeout=1)
+    )
+    assert report == {RELAY: {"accepted": 1, "rejected": 0, "failed": 0}}
+    assert len(sent) == 1
+
+
+def test_an_event_delivered_twice_is_sent_once(monkeypatch):
+    event = event_with_key()
+    signed = event.create_event("", 42021, [["ban", "kind", "4"]], verify=False)
+    report, sent = run_with_socket(
+        monkeypatch, lambda: event.deliver(RELAY, [signed, signed], ok_timeout=1)
+    )
+    assert report == {"accepted": 1, "rejected": 0, "failed": 0}
+    assert sent == [signed["id"]]
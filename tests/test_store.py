@@ -0,0 +1,85 @@
+import asyncio
+
+from nostpy_gui.event import Event
+from nostpy_gui.store import AllowlistStore
+
+RELAY = "wss://relay.example"
+
+
+def record(index, allowed=True, created_at=100):
+    return {
+        "client_pub": f"{index:064x}",
+        "kind": None,
+        "allowed": allowed,
+        "note_id": f"{index:064x}"[::-1],
+        "created_at": created_at,
+    }
+
+
+def test_save_keeps_the_newest_record_per_target():
+    store = AllowlistStore(":memory:")
+    store.save(RELAY, [record(1, allowed=True, created_at=100)])
+    store.save(RELAY, [record(1, allowed=False, created_at=200)])
+    store.save(RELAY, [record(1, allowed=True, created_at=150)])
+    assert store.load([RELAY]) == [record(1, allowed=False, created_at=200)]
+
+
+def test_records_are_kept_per_relay():
+    store = AllowlistStore(":memory:")
+    store.save(RELAY, [record(1)])
+    store.save("wss://other.example", [record(2)])
+    assert store.load([RELAY]) == [record(1)]
+    assert len(store.load([RELAY, "wss://other.example"])) == 2
+
+
+def test_search_by_pubkey_prefix():
+    store = AllowlistStore(":memory:")
+    store.save(RELAY, [record(0x10), record(0x11), record(0x20)])
+    found = store.search([RELAY], "0" * 62 + "1")
+    assert [item["client_pub"][-2:] for item in found] == ["10", "11"]
+
+
+def test_saving_does_not_move_the_sync_cursor():
+    store = AllowlistStore(":memory:")
+    store.save(RELAY, [record(1, created_at=500)])
+    assert store.last_synced(RELAY) is None
+
+
+def test_mark_synced_only_moves_forward():
+    store = AllowlistStore(":memory:")
+    store.mark_synced(RELAY, 500)
+    store.mark_synced(RELAY, 300)
+    assert store.last_synced(RELAY) == 500
+
+
+def fake_query(pages, complete):
+    # Stands in for Event._query_cached: emits the given pages, then reports
+    # whether the query ran to the end
+    async def query(relay, query_dict, timeout, emit, cache):
+        for page in pages:
+            emit(relay, page)
+        return sum(len(page) for page in pages), complete
+
+    return query
+
+
+def sync(store, pages, complete):
+    event = Event([RELAY])
+    event._query_cached = fake_query(pages, complete)
+    asyncio.run(event.query_relays({"kinds": [42021]}, store=store))
+
+
+def test_interrupted_sync_keeps_the_old_cursor():
+    store = AllowlistStore(":memory:")
+    store.mark_synced(RELAY, 100)
+    # Newest page arrived, the older ones didn't
+    sync(store, [[record(1, created_at=900)]], complete=False)
+    assert store.last_synced(RELAY) == 100
+    assert store.load([RELAY]) == [record(1, created_at=900)]
+
+
+def test_complete_sync_moves_the_cursor_to_the_newest_record():
+    store = AllowlistStore(":memory:")
+    pages = [[record(1, created_at=900)], [record(2, created_at=400)]]
+    sync(store, pages, complete=True)
+    assert store.last_synced(RELAY) == 900
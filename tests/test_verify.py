@@ -0,0 +1,31 @@
+import asyncio
+
+import secp256k1
+
+from nostpy_gui import signing
+from nostpy_gui.verify import INVALID, UNSIGNED, VALID, Verifier
+
+
+def signed(content):
+    key = secp256k1.PrivateKey()
+    public_key = key.pubkey.serialize()[1:].hex()
+    return signing.build_event(key, public_key, 1, content, 1, [])
+
+
+def test_status_comes_from_the_cache():
+    verifier = Verifier(workers=1)
+    event = signed("a")
+    assert verifier.status(event) is None
+    assert asyncio.run(verifier.verify([event, {"id": "x"}])) == [VALID, UNSIGNED]
+    assert verifier.status(event) == VALID
+    assert verifier.status(dict(event, content="b")) == INVALID
+
+
+def test_cache_evicts_least_recently_read():
+    verifier = Verifier(workers=1, cache_size=2)
+    first, second, third = signed("1"), signed("2"), signed("3")
+    asyncio.run(verifier.verify([first, second]))
+    verifier.status(first)
+    asyncio.run(verifier.verify([third]))
+    assert verifier.status(first) == VALID
+    assert verifier.status(second) is None